@@ -0,0 +1,24 @@
+"""DDR model definitions
+
+The fields modules (collection, entity, segment, files) build large FIELDS
+lists and import DDR, so they are only imported when first accessed as
+attributes of this package:
+
+    >>> import repo_models
+    >>> repo_models.entity.FIELDS    # imports repo_models.entity now
+
+Code that only parses identifiers never loads them.
+"""
+
+import importlib
+
+
+FIELDS_MODULES = ['collection', 'entity', 'segment', 'files']
+
+
+def __getattr__(name):
+    # PEP 562: called only for names not yet set on the package, so
+    # each module is imported once and then found normally.
+    if name in FIELDS_MODULES:
+        return importlib.import_module('%s.%s' % (__name__, name))
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
@@ -0,0 +1,419 @@
+"""Bulk indexing with several requests in flight, using asyncio
+
+AsyncBulkIndexer chunks documents like bulk.BulkIndexer, but sends up
+to `concurrency` chunks at once.  When that many are in flight, the
+producer's next `await indexer.index(...)` waits until one completes,
+so a fast producer (e.g. walker.walk()) never queues more than
+concurrency + 1 chunks in memory.
+
+Requests rejected with 429 (or 502-504, or a connection error) are
+retried whole.  Within a successful response, only the actions whose
+items failed with a retryable status are sent again.  Retries wait a
+random time up to backoff * 2**attempt seconds (capped at max_backoff).
+
+    >>> import asyncio
+    >>> from repo_models import asyncbulk
+    >>> async def reindex(objects):
+    ...     transport = asyncbulk.AsyncHttpTransport('http://192.168.56.1:9200')
+    ...     async with asyncbulk.AsyncBulkIndexer(transport, 'ddr{model}') as indexer:
+    ...         for o in objects:
+    ...             await indexer.index_object(o)
+    ...     return indexer.stats
+    >>> asyncio.run(reindex(objects))
+
+StubBulkServer is a local HTTP server that accepts _bulk requests and
+can be told to reject requests or items, for testing without a docstore.
+"""
+
+import asyncio
+import json
+import logging
+logger = logging.getLogger(__name__)
+import random
+from urllib.parse import urlsplit
+
+from . import serializers
+from .bulk import BulkIndexer, bulk_body
+
+
+# Whole-request and item statuses worth retrying
+RETRY_STATUSES = [429, 502, 503, 504]
+
+
+async def _read_http(reader):
+    """Read the status or request line, headers and body of an HTTP message
+
+    @returns: (first line, headers dict, body bytes)
+    """
+    first = (await reader.readline()).decode('latin-1').strip()
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        key,sep,value = line.decode('latin-1').partition(':')
+        headers[key.strip().lower()] = value.strip()
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        body = b''.join(chunks)
+    elif first.startswith('HTTP/'):
+        body = await reader.read()
+    else:
+        body = b''
+    return first,headers,body
+
+
+class AsyncHttpTransport(object):
+    """POST bulk bodies to an Elasticsearch node with asyncio streams
+    """
+
+    def __init__(self, url, timeout=60):
+        """
+        @param url: str e.g. 'http://192.168.56.1:9200'
+        @param timeout: int Seconds per request
+        """
+        split = urlsplit(url)
+        if split.scheme != 'http':
+            raise Exception('Only http:// URLs are supported: %s' % url)
+        self.host = split.hostname
+        self.port = split.port or 80
+        self.path = '%s/_bulk' % split.path.rstrip('/')
+        self.timeout = timeout
+
+    async def send(self, body):
+        """
+        @param body: bytes
+        @returns: (status, response dict or None)
+        """
+        return await asyncio.wait_for(self._send(body), self.timeout)
+
+    async def _send(self, body):
+        reader,writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write((
+                'POST %s HTTP/1.1\r\n'
+                'Host: %s:%s\r\n'
+                'Content-Type: application/x-ndjson\r\n'
+                'Content-Length: %s\r\n'
+                'Connection: close\r\n\r\n' % (
+                    self.path, self.host, self.port, len(body))
+            ).encode('latin-1'))
+            writer.write(body)
+            await writer.drain()
+            first,headers,data = await _read_http(reader)
+        finally:
+            writer.close()
+        try:
+            status = int(first.split()[1])
+        except (IndexError, ValueError):
+            # retried like any other connection error
+            raise ConnectionError('bad HTTP status line: %r' % first)
+        try:
+            response = json.loads(data.decode('utf-8'))
+        except ValueError:
+            response = None
+        return status,response
+
+
+class ThreadTransport(object):
+    """Run a blocking bulk transport (e.g. bulk.MemoryTransport) in a thread
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+
+    async def send(self, body):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(None, self.transport.send, body)
+        return 200,response
+
+
+class AsyncBulkIndexer(BulkIndexer):
+    """Chunked bulk indexing with bounded concurrency and retries
+    """
+
+    def __init__(self, transport, index, concurrency=4, retries=5,
+                 backoff=0.5, max_backoff=30.0, **kwargs):
+        """
+        @param transport: object with async send(body) -> (status, response)
+        @param index: str format string with {model}, or function(model)
+        @param concurrency: int Maximum number of requests in flight
+        @param retries: int Maximum retries per action
+        @param backoff: float Base retry delay in seconds
+        @param max_backoff: float Maximum retry delay in seconds
+        @param kwargs: max_docs, max_bytes, doc_type (see BulkIndexer)
+        """
+        super(AsyncBulkIndexer, self).__init__(transport, index, **kwargs)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats['retries'] = 0
+        self.semaphore = None
+        self.tasks = set()
+        # exceptions raised by finished requests, raised again by close()
+        self.exceptions = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            await self.close()
+        else:
+            for task in self.tasks:
+                task.cancel()
+
+    async def index(self, model, doc_id, source):
+        """Queue one document, waiting if the chunk is full and
+        `concurrency` chunks are already in flight
+
+        @param model: str
+        @param doc_id: str
+        @param source: dict Document (see serializers)
+        """
+        await self._queue(self._action(model, doc_id, source))
+
+    async def update(self, model, doc_id, doc):
+        """Queue a partial update of one document (see index)"""
+        await self._queue(self._update_action(model, doc_id, doc))
+
+    async def delete(self, model, doc_id):
+        """Queue deletion of one document (see index)"""
+        await self._queue(self._delete_action(model, doc_id))
+
+    async def _queue(self, action):
+        if self._full(len(action[0]) + len(action[1] or b'')):
+            await self.flush()
+        self._append(action)
+
+    async def index_object(self, document, parts=None):
+        """Serialize and queue a loaded object (see BulkIndexer.index_object)"""
+        identifier = document.identifier
+        if parts is None:
+            parts = identifier.parts
+        source = serializers.serializer(identifier.model)(document, parts)
+        await self.index(identifier.model, identifier.id, source)
+
+    async def flush(self):
+        """Start sending queued actions once a request slot is free"""
+        if not self.actions:
+            return
+        if self.semaphore is None:
+            # created here so that it belongs to the running loop
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        await self.semaphore.acquire()
+        task = asyncio.ensure_future(self._send(self._take()))
+        self.tasks.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            self.exceptions.append(task.exception())
+
+    async def close(self):
+        """Send queued actions and wait for all requests to finish
+
+        Raises the first exception from any request, after all have
+        finished.  Their actions are also in .errors.
+        """
+        await self.flush()
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks), return_exceptions=True)
+        if self.exceptions:
+            raise self.exceptions[0]
+
+    def _delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _fail(self, actions, status, error):
+        for action,source in actions:
+            meta = json.loads(action)
+            op = next(iter(meta))
+            meta[op].update({'status': status, 'error': error})
+            self.errors.append(meta)
+        self.stats['documents'] += len(actions)
+        self.stats['errors'] = len(self.errors)
+        logger.error('%s bulk actions failed: %s %s' % (len(actions), status, error))
+
+    async def _send(self, actions):
+        try:
+            attempt = 0
+            while actions:
+                body = bulk_body(actions)
+                try:
+                    status,response = await self.transport.send(body)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as err:
+                    status,response = None,None
+                    logger.warning('bulk request failed: %s' % err)
+                except Exception as err:
+                    self._fail(actions, None, repr(err))
+                    raise
+                self.stats['chunks'] += 1
+                self.stats['bytes'] += len(body)
+                if (status == 200) and response:
+                    actions = self._items(actions, response)
+                elif (status is not None) and (status not in RETRY_STATUSES):
+                    self._fail(actions, status, response)
+                    return
+                if not actions:
+                    return
+                if attempt >= self.retries:
+                    self._fail(actions, status, 'retries exhausted')
+                    return
+                self.stats['retries'] += len(actions)
+                await asyncio.sleep(self._delay(attempt))
+                attempt += 1
+        finally:
+            self.semaphore.release()
+
+    def _items(self, actions, response):
+        """Record results of a bulk response
+
+        @returns: list of actions to retry
+        """
+        retry = []
+        items = response.get('items', [])
+        if len(items) != len(actions):
+            self._fail(actions, 200, 'response has %s items for %s actions' % (
+                len(items), len(actions)))
+            return retry
+        for action,item in zip(actions, items):
+            result = next(iter(item.values()))
+            if result.get('status') in RETRY_STATUSES:
+                retry.append(action)
+            else:
+                self.stats['documents'] += 1
+                if result.get('error'):
+                    self.errors.append(item)
+        self.stats['errors'] = len(self.errors)
+        return retry
+
+
+async def index_objects(objects, transport, index, **kwargs):
+    """Index a stream of loaded objects with several requests in flight
+
+    @param objects: iterable of objects with .identifier
+    @param transport: object with async send(body) -> (status, response)
+    @param index: str format string with {model}, or function(model)
+    @returns: AsyncBulkIndexer (see .stats and .errors)
+    """
+    async with AsyncBulkIndexer(transport, index, **kwargs) as indexer:
+        for document in objects:
+            await indexer.index_object(document)
+    return indexer
+
+
+class StubBulkServer(object):
+    """Local HTTP server that mimics the Elasticsearch _bulk endpoint
+
+    Indexed sources are kept in .documents by (index, id); deletes
+    remove them.
+
+        >>> server = StubBulkServer(reject=lambda n: n % 5 == 0)
+        >>> url = await server.start()
+        >>> transport = AsyncHttpTransport(url)
+        ...
+        >>> await server.stop()
+    """
+
+    def __init__(self, reject=None, item_status=None, delay=0):
+        """
+        @param reject: function(request number) -> True to answer 429
+        @param item_status: function(action, request number) -> HTTP
+            status for the item, None for success
+        @param delay: float Seconds to wait before answering
+        """
+        self.reject = reject
+        self.item_status = item_status
+        self.delay = delay
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.documents = {}
+        self.server = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        @returns: str Base URL, e.g. 'http://127.0.0.1:40215'
+        """
+        self.server = await asyncio.start_server(self._handle, host, port)
+        host,port = self.server.sockets[0].getsockname()[:2]
+        return 'http://%s:%s' % (host, port)
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.requests += 1
+        number = self.requests
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            first,headers,body = await _read_http(reader)
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if not first.split()[1].endswith('/_bulk'):
+                status,response = 404,{'error': 'not found'}
+            elif self.reject and self.reject(number):
+                status,response = 429,{'error': 'rejected', 'status': 429}
+            else:
+                status,response = 200,self._bulk(body, number)
+            data = json.dumps(response).encode('utf-8')
+            writer.write((
+                'HTTP/1.1 %s X\r\n'
+                'Content-Type: application/json\r\n'
+                'Content-Length: %s\r\n'
+                'Connection: close\r\n\r\n' % (status, len(data))
+            ).encode('latin-1'))
+            writer.write(data)
+            await writer.drain()
+        finally:
+            self.in_flight -= 1
+            writer.close()
+
+    def _bulk(self, body, number):
+        items = []
+        lines = iter(body.splitlines())
+        for line in lines:
+            action = json.loads(line)
+            op = next(iter(action))
+            meta = action[op]
+            key = (meta.get('_index'), meta.get('_id'))
+            source = None
+            if op != 'delete':
+                source = json.loads(next(lines))
+            status = self.item_status(action, number) if self.item_status else None
+            result = {'_index': key[0], '_id': key[1]}
+            if status:
+                result.update({'status': status, 'error': {'type': 'stub_error'}})
+            elif op == 'delete':
+                found = self.documents.pop(key, None) is not None
+                result.update({'status': 200 if found else 404,
+                               'result': 'deleted' if found else 'not_found'})
+            elif op == 'update':
+                if key in self.documents:
+                    self.documents[key].update(source['doc'])
+                    result.update({'status': 200, 'result': 'updated'})
+                else:
+                    result.update({'status': 404,
+                                   'error': {'type': 'document_missing_exception'}})
+            else:
+                self.documents[key] = source
+                result.update({'status': 201, 'result': 'created'})
+            items.append({op: result})
+        errors = any(
+            ('error' in result) for item in items for result in item.values()
+        )
+        return {'took': 1, 'errors': errors, 'items': items}
@@ -0,0 +1,658 @@
+"""Micro-benchmarks for repo_models
+
+Run from the repository root:
+
+    $ python -m repo_models.benchmark            # all benchmarks
+    $ python -m repo_models.benchmark resolver   # one benchmark
+
+Each benchmark prints one line per implementation with the best of
+several timing runs.
+"""
+
+import sys
+import timeit
+
+
+def sample_ids(collections=2, entities=50, files=4):
+    """Synthetic IDs for a small repository, one of each kind per level.
+
+    @param collections: int Number of collections
+    @param entities: int Number of entities per collection
+    @param files: int Number of files per entity
+    @returns: list of str
+    """
+    ids = []
+    for cid in range(1, collections+1):
+        cid_ = 'ddr-densho-%s' % cid
+        ids.append(cid_)
+        for eid in range(1, entities+1):
+            eid_ = '%s-%s' % (cid_, eid)
+            ids.append(eid_)
+            ids.append('%s-1' % eid_)
+            for n in range(files):
+                ids.append('%s-master-%010x' % (eid_, n * 7919 + eid))
+                ids.append('%s-1-mezzanine-%010x' % (eid_, n * 7919 + eid))
+    return ids
+
+def sample_paths(basepath='/var/www/media/ddr', **kwargs):
+    """Absolute paths corresponding to sample_ids().
+
+    @param basepath: str
+    @returns: list of str
+    """
+    paths = []
+    for i in sample_ids(**kwargs):
+        parts = i.split('-')
+        cid = '-'.join(parts[:3])
+        eid = '-'.join(parts[:4])
+        if len(parts) == 3:
+            paths.append('%s/%s/collection.json' % (basepath, cid))
+        elif len(parts) == 4:
+            paths.append('%s/%s/files/%s/entity.json' % (basepath, cid, i))
+        elif len(parts) == 5:
+            paths.append('%s/%s/files/%s/files/%s/entity.json' % (
+                basepath, cid, eid, i))
+        elif len(parts) == 6:
+            paths.append('%s/%s/files/%s/files/%s.json' % (
+                basepath, cid, eid, i))
+        else:
+            sid = '-'.join(parts[:5])
+            paths.append('%s/%s/files/%s/files/%s/files/%s.json' % (
+                basepath, cid, eid, sid, i))
+    return paths
+
+def sample_urls(**kwargs):
+    """Editor and public URLs corresponding to sample_ids().
+
+    @returns: list of str
+    """
+    urls = []
+    for i in sample_ids(**kwargs):
+        urls.append('/ui/%s' % i)
+        urls.append('/%s' % i.replace('-', '/'))
+    return urls
+
+def sample_tree(basepath, **kwargs):
+    """Write a collection tree for sample_ids() under basepath.
+
+    Each object gets its JSON file; files also get an empty binary and
+    access file, and each collection an empty .git/annex directory.
+
+    @param basepath: str
+    @returns: list of collection directory paths
+    """
+    import os
+    collections = []
+    for path in sample_paths(basepath=basepath, **kwargs):
+        dirname,name = os.path.split(path)
+        os.makedirs(dirname, exist_ok=True)
+        open(path, 'w').close()
+        if name == 'collection.json':
+            collections.append(dirname)
+            os.makedirs(os.path.join(dirname, '.git', 'annex'), exist_ok=True)
+        elif not name.endswith('entity.json'):
+            base = path[:-len('.json')]
+            open(base + '.tif', 'w').close()
+            open(base + '-a.jpg', 'w').close()
+    return collections
+
+def _report(name, func, data, number=3, repeat=5, items=None):
+    """Time func(x) for each x in data and print per-item cost.
+
+    For batch APIs pass data=[batch] and items=len(batch).
+    """
+    def loop():
+        for x in data:
+            func(x)
+    best = min(timeit.repeat(loop, number=number, repeat=repeat))
+    per_item = best / (number * (items or len(data))) * 1e6
+    print('    %-28s %8.3f us/item' % (name, per_item))
+    return per_item
+
+
+# benchmarks -----------------------------------------------------------
+
+def bench_resolver():
+    """Bucketed pattern dispatch vs trying every pattern in turn"""
+    from . import resolver
+    for kind,data in [
+            ('id', sample_ids()),
+            ('path', sample_paths()),
+            ('url', sample_urls()),
+    ]:
+        print('  %s (%s items)' % (kind, len(data)))
+        _report('resolve_naive', lambda x: resolver.resolve_naive(x, kind), data)
+        _report('resolve', lambda x: resolver.resolve(x, kind), data)
+        resolver.CACHE.clear()
+        _report('resolve_cached', lambda x: resolver.resolve_cached(x, kind), data)
+
+def bench_parse_id():
+    """Generated ID tokenizer vs bucketed and naive pattern matching"""
+    from . import resolver
+    ids = sample_ids(20, 100, 5)
+    for name,data in [
+            ('collection/entity', [i for i in ids if i.count('-') < 5]),
+            ('file', [i for i in ids if i.count('-') == 5]),
+            ('segment file', [i for i in ids if i.count('-') == 6]),
+    ]:
+        print('  %s (%s items)' % (name, len(data)))
+        _report('resolve_naive', lambda x: resolver.resolve_naive(x, 'id'), data)
+        _report('bucketed dispatcher', resolver.DISPATCHERS['id'].resolve, data)
+        _report('parse_id', resolver.parse_id, data)
+
+def bench_formatters():
+    """Compiled template builders vs str.format over candidate templates"""
+    from . import formatters, resolver
+    from .identifier import IDENTIFIERS
+    templates = {i['model']: i['templates'] for i in IDENTIFIERS}
+    def str_format(model, parts, kind, subkind):
+        for template in templates[model][kind][subkind]:
+            try:
+                return template.format(basepath='/var/www/media/ddr', **parts)
+            except KeyError:
+                pass
+    data = [resolver.resolve(i, 'id') for i in sample_ids()]
+    for kind,subkind in [('path', 'abs'), ('url', 'public')]:
+        print('  %s %s (%s items)' % (kind, subkind, len(data)))
+        _report('str.format',
+                lambda x: str_format(x[0], x[1], kind, subkind), data)
+        _report('formatters',
+                lambda x: formatters._format(
+                    (x[0], kind, subkind), x[1], '/var/www/media/ddr'),
+                data)
+
+def bench_resolve_many():
+    """resolve_many() vs building the same columns with resolve() in a loop"""
+    import random
+    from . import resolver
+    def loop(texts, kind):
+        codes = []
+        columns = {name: [] for name in resolver.COMPONENTS}
+        for text in texts:
+            result = resolver.resolve(text, kind)
+            if result:
+                codes.append(resolver.MODEL_INDEX[result[0]])
+                parts = result[1]
+            else:
+                codes.append(-1)
+                parts = {}
+            for name in resolver.COMPONENTS:
+                columns[name].append(parts.get(name, ''))
+        return codes,columns
+    for kind,data in [
+            ('id', sample_ids(20, 100, 5)),
+            ('path', sample_paths(collections=20, entities=100, files=5)),
+            ('url', sample_urls(collections=20, entities=100, files=5)),
+    ]:
+        random.shuffle(data)
+        print('  %s (%s items)' % (kind, len(data)))
+        _report('resolve loop', lambda x: loop(x, kind), [data],
+                number=1, items=len(data))
+        _report('resolve_many', lambda x: resolver.resolve_many(x, kind), [data],
+                number=1, items=len(data))
+
+def bench_parts():
+    """Memory held by parts dicts vs IdParts records"""
+    import tracemalloc
+    from . import resolver
+    from .parts import IdParts
+    parsed = [resolver.resolve(i, 'id')[1] for i in sample_ids(20, 100, 5)]
+    for name,make in [('dict', dict), ('IdParts', IdParts.from_dict)]:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        records = [make(parts) for parts in parsed]
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('    %-28s %8.1f bytes/item' % (
+            name, (after - before) / len(records)))
+        del records
+
+def bench_lineage():
+    """Cached prefix lineage vs formatting each ancestor's ID template"""
+    from . import lineage, resolver
+    from .identifier import IDENTIFIERS
+    by_model = {i['model']: i for i in IDENTIFIERS}
+    def naive(model, parts):
+        chain = []
+        while model:
+            for template in by_model[model]['templates']['id']:
+                try:
+                    chain.append(template.format(**parts))
+                    break
+                except KeyError:
+                    pass
+            parents = by_model[model]['parents']
+            model = None
+            for parent in parents:
+                name = by_model[parent]['component']['name']
+                if parts.get(name):
+                    model = parent
+                    break
+        return chain
+    data = [resolver.resolve(i, 'id') for i in sample_ids(20, 100, 5)]
+    print('  (%s items)' % len(data))
+    _report('format templates', lambda x: naive(x[0], x[1]), data)
+    _report('lineage', lambda x: lineage.lineage(x[1]), data)
+
+def bench_walker():
+    """scandir walker (serial and parallel) vs os.walk and path regexes"""
+    import tempfile
+    from . import walker
+    with tempfile.TemporaryDirectory() as tmp:
+        collections = sample_tree(tmp, collections=4, entities=100, files=5)
+        items = sum(len(list(walker.walk(c))) for c in collections)
+        print('  (%s objects)' % items)
+        _report('os.walk + regex', lambda x: list(walker.walk_naive(x)),
+                collections, items=items)
+        _report('walker', lambda x: list(walker.walk(x)),
+                collections, items=items)
+        _report('walk_parallel', lambda x: list(walker.walk_parallel(x)),
+                [collections], number=1, items=items)
+        _report('walk_parallel ordered',
+                lambda x: list(walker.walk_parallel(x, ordered=True)),
+                [collections], number=1, items=items)
+
+def bench_loader():
+    """Thread-pool JSON loading vs one file at a time"""
+    import importlib
+    import tempfile
+    from . import objectfiles, walker
+    try:
+        # load_many() imports these itself; fail early if DDR is missing
+        for name in ['collection', 'entity', 'files', 'segment']:
+            importlib.import_module('.%s' % name, __package__)
+    except ImportError as err:
+        print('    unavailable (%s)' % err)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        collections = sample_tree(tmp, collections=2, entities=500, files=4)
+        records = [r for c in collections for r in walker.walk(c)]
+        for r in records:
+            with open(r.path, 'w') as f:
+                f.write(objectfiles.dumps([
+                    {'application': 'https://github.com/densho/ddr-cmdln.git'},
+                    {'id': r.id},
+                    {'record_created': '2017-11-01T12:34:56'},
+                    {'record_lastmod': '2017-11-01T12:34:56'},
+                    {'title': 'Title of %s' % r.id},
+                    {'description': 'x' * 500},
+                ]))
+        print('  (%s objects)' % len(records))
+        _report('load', objectfiles.load, records, number=1)
+        for workers in [1, 8]:
+            _report('load_many workers=%s' % workers,
+                    lambda x: list(objectfiles.load_many(x, workers=workers)),
+                    [records], number=1, items=len(records))
+
+def bench_choices():
+    """Choice label lookup tables vs scanning the CHOICES lists"""
+    import random
+    from . import common
+    random.seed(0)
+    genres = [random.choice(common.GENRE_CHOICES)[0] for n in range(10000)]
+    def scan(data):
+        for c in common.GENRE_CHOICES:
+            if data == c[0]:
+                return c[1]
+        return data
+    print('  (%s values)' % len(genres))
+    _report('genre scan', scan, genres)
+    _report('genre choice_label',
+            lambda x: common.choice_label(common.GENRE_LABELS, x), genres)
+    # display_language: any code that is `in` the value (a substring of
+    # a str) gets its label, so a code -> label map does not apply.
+    # Lookup of each substring of a code's length vs the scan it keeps.
+    from . import entity
+    lengths = sorted(set(len(c[0]) for c in common.LANGUAGE_CHOICES))
+    positions = {}
+    for n,(code,label) in enumerate(common.LANGUAGE_CHOICES):
+        positions.setdefault(code, []).append(n)
+    def lookup(data):
+        found = set()
+        if isinstance(data, str):
+            for length in lengths:
+                for i in range(len(data) - length + 1):
+                    found.update(positions.get(data[i:i+length], ()))
+        else:
+            for item in data:
+                found.update(positions.get(item, ()))
+        return ', '.join(common.LANGUAGE_CHOICES[n][1] for n in sorted(found))
+    languages = [
+        random.choice(['eng', 'eng;jpn', ['eng', 'jpn'], ['jpn']])
+        for n in range(10000)
+    ]
+    print('  (%s language values)' % len(languages))
+    _report('display_language scan', entity.display_language, languages)
+    _report('substring lookup', lookup, languages)
+
+def bench_display():
+    """display_* multi-value fields for a browse page of 100 entities"""
+    try:
+        import jinja2
+        from . import display
+    except ImportError as err:
+        print('    unavailable (%s)' % err)
+        return
+    creators = '{% if data.id %}' \
+               + '<a href="{{ data.id }}">{{ data.role }}: {{ data.namepart }}</a>' \
+               + '{% else %}' \
+               + '{{ data.role }}: {{ data.namepart }}' \
+               + '{% endif %}'
+    link = '<a href="{{ data.id }}">{{ data.term }}</a>'
+    entity = [
+        (creators, [{'namepart': 'Toyo Miyatake', 'role': 'photographer', 'id': '10'},
+                    {'namepart': 'Densho', 'role': 'publisher'}]),
+        (link, [{'id': str(n), 'term': 'Topic %s' % n} for n in range(5)]),
+        (link, [{'id': '5', 'term': 'Manzanar'}]),
+        ('<a href="{{ data.person }}">{{ data.person }}</a>',
+         [{'person': 'Shimomura, Mitsuko'}, {'person': 'Miyatake, Toyo'}]),
+        ('{{ data.term }}', [{'term': '1942-1945'}]),
+        (link, [{'id': 'http://vocab.getty.edu/tgn/7013445', 'term': 'Manzanar'}]),
+    ]
+    page = [entity] * 100
+    def per_item(fields):
+        # DDR.converters.render() for each item
+        for template,data in fields:
+            '\n'.join(
+                jinja2.Template(template).render(data=d) if type(d) == type({}) else d
+                for d in data
+            )
+    def cached(fields):
+        for template,data in fields:
+            '\n'.join(
+                display.render(template, d) if type(d) == type({}) else d
+                for d in data
+            )
+    def whole_list(fields):
+        for template,data in fields:
+            display.render_list(template, data)
+    print('  (%s entities, %s fields each)' % (len(page), len(entity)))
+    _report('converters.render per item', per_item, page, number=1)
+    _report('cached template per item', cached, page)
+    _report('render_list', whole_list, page)
+
+def bench_json():
+    """Object file parsing and DDR-format serialization by JSON backend"""
+    from . import jsonbackend
+    objects = []
+    for oid in sample_ids(1, 500, 4):
+        objects.append([
+            {'application': 'https://github.com/densho/ddr-cmdln.git',
+             'app_commit': '0123456789abcdef 2017-11-01 12:34:56 -0800',
+             'git_version': 'git version 2.11.0; git-annex version: 6.20170101'},
+            {'id': oid},
+            {'record_created': '2017-11-01T12:34:56'},
+            {'record_lastmod': '2017-11-01T12:34:56'},
+            {'status': 'completed'},
+            {'public': '1'},
+            {'title': 'Mitsuko Shimomura at Manzanar 下村'},
+            {'description': 'x' * 500},
+            {'creators': [{'namepart': 'Toyo Miyatake', 'role': 'photographer', 'id': 10}]},
+            {'topics': [{'id': '120', 'term': 'Japanese American Religious groups'}] * 3},
+            {'language': ['eng', 'jpn']},
+            {'sort': 1},
+            {'notes': ''},
+        ] + [{'field%s' % n: 'value %s' % n} for n in range(20)])
+    texts = [jsonbackend.BACKENDS['json'][1](o) for o in objects]
+    print('  (%s objects)' % len(objects))
+    for name,(loads,dumps) in sorted(jsonbackend.BACKENDS.items()):
+        assert [dumps(o) for o in objects] == texts
+        _report('%s dumps' % name, dumps, objects)
+        _report('%s loads' % name, loads, texts)
+    if 'orjson' not in jsonbackend.BACKENDS:
+        print('    orjson                       unavailable')
+
+def bench_router():
+    """URL router vs bucketed and naive pattern matching"""
+    import random
+    from . import resolver, router
+    # an even mix of editor and public pages
+    urls = sample_urls(collections=10, entities=100, files=4)
+    random.seed(0)
+    data = random.sample(urls, 20000)
+    print('  (%s requests)' % len(data))
+    _report('resolve_naive', lambda x: resolver.resolve_naive(x, 'url'), data)
+    bucketed = _report('bucketed dispatcher', resolver.DISPATCHERS['url'].resolve, data)
+    per_item = _report('route', router.route, data)
+    print('    %-28s %8d requests/s/core' % ('bucketed dispatcher', 1e6 / bucketed))
+    print('    %-28s %8d requests/s/core' % ('route', 1e6 / per_item))
+
+def bench_hooks():
+    """Prebuilt hook pairs vs hasattr/getattr by name for each field"""
+    import types
+    from .hooks import Hooks
+    # a module shaped like entity: 30 fields, a third with index_* hooks
+    names = ['field%s' % n for n in range(30)]
+    module = types.ModuleType('fields')
+    for name in names[::3]:
+        setattr(module, 'index_%s' % name, str.upper)
+    hooks = Hooks(vars(module), names)
+    documents = [{name: 'value' for name in names} for n in range(1000)]
+    def by_name(document):
+        data = {}
+        for name in names:
+            if hasattr(module, 'index_%s' % name):
+                data[name] = getattr(module, 'index_%s' % name)(document[name])
+            else:
+                data[name] = document[name]
+        return data
+    print('  (%s documents, %s fields)' % (len(documents), len(names)))
+    _report('hasattr/getattr', by_name, documents)
+    _report('Hooks.convert', lambda x: hooks.convert('index', x), documents)
+
+def bench_serializer():
+    """Generated serializers vs dsl.Document + to_dict() per document"""
+    from datetime import datetime
+    import types
+    try:
+        from . import elastic, serializers
+        from .hooks import identity
+    except ImportError as err:
+        print('    unavailable (%s)' % err)
+        return
+    from . import resolver
+    samples = {
+        'date': datetime(2017, 11, 1, 12, 0, 0),
+        'long': 1, 'integer': 1,
+        'nested': [{'id': '1', 'term': 'Term'}],
+    }
+    for model,oid in [('entity', 'ddr-densho-10-5'),
+                      ('file', 'ddr-densho-10-5-master-a1b2c3d4e5')]:
+        esclass = {
+            c['doctype']: c['class'] for c in elastic.ELASTICSEARCH_CLASSES['all']
+        }[model]
+        properties = serializers.doctype_properties(esclass)
+        hooks = elastic.fields_module(model).HOOKS['index']
+        parts = resolver.resolve_cached(oid, 'id')[1]
+        documents = []
+        for n in range(1000):
+            o = types.SimpleNamespace(**{
+                name: samples.get(props.get('type'), 'value %s' % n)
+                for name,props in properties.items()
+            })
+            o.id = oid
+            documents.append(o)
+        def dsl_path(o):
+            d = esclass()
+            d.meta.id = o.id
+            for name in properties:
+                if name in serializers.FROM_IDENTIFIER:
+                    continue
+                hook = hooks.get(name, identity)
+                value = hook(getattr(o, name, None))
+                if value:
+                    setattr(d, name, value)
+            for key in serializers.COMPONENTS:
+                setattr(d, key, parts.get(key, ''))
+            d.parent_id = serializers.parent_id(parts)
+            d.collection_id = serializers.collection_id(parts)
+            d.lineage = [a._asdict() for a in serializers.lineage(parts)]
+            return d.to_dict()
+        serialize = serializers.serializer(model)
+        assert serialize(documents[0], parts) == dsl_path(documents[0])
+        print('  %s (%s documents)' % (model, len(documents)))
+        _report('dsl.Document', dsl_path, documents)
+        _report('serializer', lambda o: serialize(o, parts), documents)
+
+def bench_bulk():
+    """Chunked bulk NDJSON vs bare JSON encoding of the same documents"""
+    import json
+    from . import bulk
+    ids = sample_ids(20, 1000, 4)[:100000]
+    sources = [
+        {'id': i, 'title': 'Title of %s' % i, 'description': 'x' * 200,
+         'status': 'completed', 'public': '1', 'sort': 1,
+         'topics': [{'id': '120', 'term': 'Japanese American Religious groups'}]}
+        for i in ids
+    ]
+    def encode_only(data):
+        for source in data:
+            json.dumps(source)
+    def indexer(data):
+        transport = bulk.MemoryTransport(response=lambda body: {'errors': False})
+        with bulk.BulkIndexer(transport, 'ddr{model}') as ix:
+            for source in data:
+                ix.index('entity', source['id'], source)
+    print('  (%s documents)' % len(sources))
+    _report('json.dumps only', encode_only, [sources],
+            number=1, repeat=3, items=len(sources))
+    _report('BulkIndexer', indexer, [sources],
+            number=1, repeat=3, items=len(sources))
+
+def bench_async_bulk():
+    """Bulk requests in flight against a local _bulk stub (20 ms per request)"""
+    import asyncio
+    from . import asyncbulk
+    ids = sample_ids(20, 1000, 4)[:20000]
+    sources = [{'id': i, 'title': 'Title of %s' % i} for i in ids]
+    async def run(concurrency, reject):
+        server = asyncbulk.StubBulkServer(reject=reject, delay=0.02)
+        url = await server.start()
+        transport = asyncbulk.AsyncHttpTransport(url)
+        async with asyncbulk.AsyncBulkIndexer(
+                transport, 'ddr{model}', concurrency=concurrency,
+                max_docs=200, backoff=0.01) as ix:
+            for source in sources:
+                await ix.index('entity', source['id'], source)
+        await server.stop()
+        assert len(server.documents) == len(sources)
+    every_5th = lambda n: n % 5 == 0
+    print('  (%s documents, 200 per request)' % len(sources))
+    for concurrency in [1, 4, 8]:
+        _report('concurrency=%s' % concurrency,
+                lambda _: asyncio.run(run(concurrency, None)), [None],
+                number=1, repeat=3, items=len(sources))
+    _report('concurrency=4, 20% 429s',
+            lambda _: asyncio.run(run(4, every_5th)), [None],
+            number=1, repeat=3, items=len(sources))
+
+_STARTUP = """
+import time
+t0 = time.perf_counter()
+from repo_models import resolver
+if %(eager)r:
+    # what importing used to do
+    for d in resolver.DISPATCHERS.values():
+        [regex.compiled() for model,regex,tokens in d.patterns]
+    resolver.ID_TOKENIZER.parse
+t1 = time.perf_counter()
+resolver.resolve('ddr-densho-10-5', 'id')
+resolver.resolve('/var/www/media/ddr/ddr-densho-10/collection.json', 'path')
+resolver.resolve('/ddr/densho/10/5', 'url')
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t0)
+"""
+
+def _cold_times(code, env=None, repeat=10):
+    """Run code in fresh interpreters; best of each number it prints.
+
+    Bytecode caching is left on, as in a deployed worker.
+
+    @param code: str Python source printing one or more timings (s)
+    @param env: dict Extra environment variables
+    @returns: list of float (ms), or str error message if code fails
+    """
+    import os, subprocess
+    environ = dict(os.environ)
+    environ.pop('PYTHONDONTWRITEBYTECODE', None)
+    environ.update(env or {})
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    runs = []
+    for n in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=root, env=environ, capture_output=True, text=True,
+        )
+        if proc.returncode:
+            return proc.stderr.strip().splitlines()[-1]
+        runs.append([float(x) for x in proc.stdout.split()])
+    return [min(values) * 1e3 for values in zip(*runs)]
+
+def bench_startup():
+    """Cold-start cost of importing and first use of the resolver"""
+    _cold_times(_STARTUP % {'eager': False}, repeat=1)  # write .pyc files
+    for name,eager in [
+            ('everything at import', True),
+            ('lazy', False),
+    ]:
+        imported,used = _cold_times(_STARTUP % {'eager': eager})
+        print('    %-28s %6.1f ms import %6.1f ms incl. first use' % (
+            name, imported, used))
+
+_IMPORTS = """
+import time
+t0 = time.perf_counter()
+import %(module)s
+t1 = time.perf_counter()
+if %(fields)r:
+    import repo_models
+    for name in repo_models.FIELDS_MODULES:
+        getattr(repo_models, name).FIELDS
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t0)
+"""
+
+def bench_imports():
+    """Cold-start cost of importing modules, with and without FIELDS modules"""
+    for module in ['repo_models.resolver', 'repo_models.elastic']:
+        for fields in [False, True]:
+            name = '%s%s' % (module, ' + FIELDS' if fields else '')
+            code = _IMPORTS % {'module': module, 'fields': fields}
+            _cold_times(code, repeat=1)  # write .pyc files
+            result = _cold_times(code)
+            if isinstance(result, str):
+                print('    %-40s unavailable (%s)' % (name, result))
+            else:
+                print('    %-40s %6.1f ms' % (name, result[1]))
+
+
+BENCHMARKS = {
+    'async_bulk': bench_async_bulk,
+    'bulk': bench_bulk,
+    'choices': bench_choices,
+    'display': bench_display,
+    'formatters': bench_formatters,
+    'hooks': bench_hooks,
+    'imports': bench_imports,
+    'json': bench_json,
+    'lineage': bench_lineage,
+    'loader': bench_loader,
+    'parse_id': bench_parse_id,
+    'parts': bench_parts,
+    'resolve_many': bench_resolve_many,
+    'resolver': bench_resolver,
+    'router': bench_router,
+    'serializer': bench_serializer,
+    'startup': bench_startup,
+    'walker': bench_walker,
+}
+
+
+def main(names):
+    for name in (names or sorted(BENCHMARKS.keys())):
+        print('%s: %s' % (name, BENCHMARKS[name].__doc__))
+        BENCHMARKS[name]()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
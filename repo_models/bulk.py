@@ -0,0 +1,305 @@
+"""Chunked Elasticsearch bulk indexing
+
+Instead of saving one dsl.Document per request, objects are serialized
+(see serializers) into newline-delimited bulk API bodies that are sent
+when they reach max_docs documents or max_bytes bytes:
+
+    >>> from repo_models import bulk
+    >>> transport = bulk.HttpTransport('http://192.168.56.1:9200')
+    >>> with bulk.BulkIndexer(transport, 'ddr{model}') as indexer:
+    ...     for o in objects:
+    ...         indexer.index_object(o)
+    >>> indexer.stats
+    {'documents': 100000, 'chunks': 200, 'bytes': 51234567, 'errors': 0}
+
+The index name is either a format string with a {model} field or a
+function(model) -> str.
+
+Transports take a complete body (bytes) and return the bulk API response
+as a dict.  FileTransport and MemoryTransport record bodies for testing
+and for loading with curl later.
+"""
+
+from datetime import date, datetime
+import json
+import logging
+logger = logging.getLogger(__name__)
+import urllib.request
+
+from . import serializers
+
+
+MAX_DOCS = 500
+MAX_BYTES = 10 * 1024 * 1024
+
+
+def _default(value):
+    """JSON encoding for values the stdlib encoder does not handle"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError('Cannot serialize %r' % (value,))
+
+_encode = json.JSONEncoder(
+    ensure_ascii=False, separators=(',', ':'), default=_default
+).encode
+
+
+def _ok_response(body):
+    """Response for a transport that does not talk to Elasticsearch"""
+    items = []
+    lines = iter(body.splitlines())
+    for line in lines:
+        op = next(iter(json.loads(line)))
+        items.append({op: {'status': 200}})
+        if op != 'delete':
+            # skip the source line
+            next(lines, None)
+    return {'took': 0, 'errors': False, 'items': items}
+
+
+class FileTransport(object):
+    """Append bulk bodies to a file (load later with curl --data-binary)
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, body):
+        with open(self.path, 'ab') as f:
+            f.write(body)
+        return _ok_response(body)
+
+
+class MemoryTransport(object):
+    """Keep bulk bodies in memory; for tests and benchmarks
+    """
+
+    def __init__(self, response=None):
+        """
+        @param response: function(body) -> dict Bulk API response to
+            return; default reports every action as successful
+        """
+        self.bodies = []
+        self.response = response or _ok_response
+
+    def send(self, body):
+        self.bodies.append(body)
+        return self.response(body)
+
+    def lines(self):
+        """All NDJSON lines sent so far, decoded"""
+        return [
+            json.loads(line)
+            for body in self.bodies
+            for line in body.splitlines()
+        ]
+
+
+class HttpTransport(object):
+    """POST bulk bodies to an Elasticsearch node's _bulk endpoint
+    """
+
+    def __init__(self, url, timeout=60):
+        """
+        @param url: str e.g. 'http://192.168.56.1:9200'
+        @param timeout: int Seconds
+        """
+        self.url = '%s/_bulk' % url.rstrip('/')
+        self.timeout = timeout
+
+    def send(self, body):
+        request = urllib.request.Request(
+            self.url, data=body, method='POST',
+            headers={'Content-Type': 'application/x-ndjson'},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+
+
+class BulkIndexer(object):
+    """Collect bulk actions and send them in bounded chunks
+    """
+
+    def __init__(self, transport, index, max_docs=MAX_DOCS, max_bytes=MAX_BYTES,
+                 doc_type=False):
+        """
+        @param transport: object with send(body) -> response dict
+        @param index: str format string with {model}, or function(model)
+        @param max_docs: int Maximum number of actions per chunk
+        @param max_bytes: int Maximum chunk size, unless a single
+            document is larger
+        @param doc_type: boolean Include '_type' (the model) in actions,
+            for Elasticsearch versions with mapping types
+        """
+        self.transport = transport
+        if callable(index):
+            self.index_name = index
+        else:
+            self.index_name = lambda model: index.format(model=model)
+        self.max_docs = max_docs
+        self.max_bytes = max_bytes
+        self.doc_type = doc_type
+        self.actions = []
+        self.size = 0
+        self.errors = []
+        self.stats = {'documents': 0, 'chunks': 0, 'bytes': 0, 'errors': 0}
+        self._prefixes = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+
+    def _prefix(self, op, model):
+        """Start of the action line up to the document ID, cached"""
+        key = (op, model)
+        try:
+            return self._prefixes[key]
+        except KeyError:
+            pass
+        meta = '"_index":%s' % _encode(self.index_name(model))
+        if self.doc_type:
+            meta += ',"_type":%s' % _encode(model)
+        prefix = self._prefixes[key] = '{"%s":{%s,"_id":' % (op, meta)
+        return prefix
+
+    def _full(self, size):
+        """Whether the chunk must be sent before adding size more bytes"""
+        return bool(self.actions) and (
+            (len(self.actions) >= self.max_docs)
+            or (self.size + size > self.max_bytes)
+        )
+
+    def _action(self, model, doc_id, source):
+        """(action line, source line) as bytes"""
+        return (
+            ('%s%s}}\n' % (self._prefix('index', model), _encode(doc_id))).encode('utf-8'),
+            (_encode(source) + '\n').encode('utf-8'),
+        )
+
+    def _update_action(self, model, doc_id, doc):
+        """(action line, partial document line) as bytes"""
+        return (
+            ('%s%s}}\n' % (self._prefix('update', model), _encode(doc_id))).encode('utf-8'),
+            ('{"doc":%s}\n' % _encode(doc)).encode('utf-8'),
+        )
+
+    def _delete_action(self, model, doc_id):
+        """(action line, None) as bytes; delete actions have no source"""
+        return (
+            ('%s%s}}\n' % (self._prefix('delete', model), _encode(doc_id))).encode('utf-8'),
+            None,
+        )
+
+    def _append(self, action):
+        self.actions.append(action)
+        self.size += len(action[0]) + len(action[1] or b'')
+
+    def _take(self):
+        """Remove and return the queued actions"""
+        actions = self.actions
+        self.actions = []
+        self.size = 0
+        return actions
+
+    def _record(self, actions, body, response):
+        """Update stats and errors from a bulk response"""
+        self.stats['documents'] += len(actions)
+        self.stats['chunks'] += 1
+        self.stats['bytes'] += len(body)
+        if response.get('errors'):
+            for item in response.get('items', []):
+                for op,result in item.items():
+                    if result.get('error'):
+                        self.errors.append(item)
+            self.stats['errors'] = len(self.errors)
+            logger.error('%s bulk errors' % self.stats['errors'])
+
+    def index(self, model, doc_id, source):
+        """Queue one document
+
+        @param model: str
+        @param doc_id: str
+        @param source: dict Document (see serializers)
+        """
+        self._queue(self._action(model, doc_id, source))
+
+    def update(self, model, doc_id, doc):
+        """Queue a partial update of one document
+
+        @param model: str
+        @param doc_id: str
+        @param doc: dict Fields to set
+        """
+        self._queue(self._update_action(model, doc_id, doc))
+
+    def delete(self, model, doc_id):
+        """Queue deletion of one document
+
+        @param model: str
+        @param doc_id: str
+        """
+        self._queue(self._delete_action(model, doc_id))
+
+    def _queue(self, action):
+        """Queue an action, sending the chunk first if it is full"""
+        if self._full(len(action[0]) + len(action[1] or b'')):
+            self.flush()
+        self._append(action)
+
+    def index_object(self, document, parts=None):
+        """Serialize and queue a loaded object
+
+        @param document: object with .identifier (e.g. DDR.models.Entity)
+        @param parts: dict or IdParts; default document.identifier.parts
+        """
+        identifier = document.identifier
+        if parts is None:
+            parts = identifier.parts
+        source = serializers.serializer(identifier.model)(document, parts)
+        self.index(identifier.model, identifier.id, source)
+
+    def flush(self):
+        """Send queued actions, if any
+
+        @returns: dict Bulk API response or None
+        """
+        if not self.actions:
+            return None
+        actions = self._take()
+        body = bulk_body(actions)
+        response = self.transport.send(body)
+        self._record(actions, body, response)
+        return response
+
+
+def bulk_body(actions):
+    """Bulk API request body
+
+    @param actions: list of (action line, source line or None) bytes
+    @returns: bytes
+    """
+    return b''.join(
+        line
+        for action in actions
+        for line in action
+        if line is not None
+    )
+
+
+def index_objects(objects, transport, index, **kwargs):
+    """Index a stream of loaded objects in chunks
+
+    @param objects: iterable of objects with .identifier
+    @param transport: object with send(body) -> response dict
+    @param index: str format string with {model}, or function(model)
+    @returns: BulkIndexer (see .stats and .errors)
+    """
+    with BulkIndexer(transport, index, **kwargs) as indexer:
+        for document in objects:
+            indexer.index_object(document)
+    return indexer
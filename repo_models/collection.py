@@ -4,6 +4,10 @@ import logging
 logger = logging.getLogger(__name__)
 
 from DDR import converters
+from . import common
+from . import display
+from .fieldsets import FieldSet
+from .hooks import Hooks
 
 
 
@@ -34,6 +38,11 @@ LANGUAGE_CHOICES = [['',''],
                     ['spa','Spanish'],
                     ['tgl','Tagalog'],]
 
+# Frozen code -> label maps; see common.choice_labels
+STATUS_LABELS = common.choice_labels(STATUS_CHOICES)
+PERMISSIONS_LABELS = common.choice_labels(PERMISSIONS_CHOICES)
+RIGHTS_LABELS = common.choice_labels(RIGHTS_CHOICES)
+
 FIELDS = [
     
     {
@@ -946,6 +955,9 @@ FIELDS = [
 # List of FIELDS to be excluded when exporting and updating.
 FIELDS_CSV_EXCLUDED = []
 
+# Precomputed views of FIELDS; see fieldsets.FieldSet.
+FIELDSET = FieldSet(MODEL, FIELDS, FIELDS_CSV_EXCLUDED)
+
 
 
 # jsonload_* --- load-from-json functions ----------------------------
@@ -988,22 +1000,13 @@ def display_record_lastmod(data):
     )
 
 def display_status( data ):
-    for c in STATUS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(STATUS_LABELS, data)
 
 def display_public( data ):
-    for c in PERMISSIONS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(PERMISSIONS_LABELS, data)
 
 def display_rights( data ):
-    for c in RIGHTS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(RIGHTS_LABELS, data)
 
 # title
 
@@ -1050,13 +1053,7 @@ def display_language( data ):
 # The following are utility functions used by display_* functions.
 
 def _display_multiline_dict( template, data ):
-    t = []
-    for d in data:
-        if type(d) == type({}):
-            t.append(converters.render(template, d))
-        else:
-            t.append(d)
-    return '\n'.join(t)
+    return display.render_list(template, data)
 
 
 # index_* --- format for Elasticsearch functions -----------------------
@@ -1180,3 +1177,13 @@ def _formpost_basic(data):
         except:
             return data
     return ''
+
+
+
+# hook tables ---------------------------------------------------------
+#
+# Functions above by family and field name; see hooks.Hooks.
+# Keep this at the end of the module, after all hook functions.
+#
+
+HOOKS = Hooks(globals(), FIELDSET.names)
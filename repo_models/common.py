@@ -1,3 +1,5 @@
+from types import MappingProxyType
+
 
 STATUS_CHOICES = [['inprocess', 'In Progress'],
                   ['completed', 'Completed'],]
@@ -76,3 +78,39 @@ FORMAT_CHOICES = [['av','Audio/Visual'],
                   ['doc','Document'],
                   ['img','Still Image'],
                   ['vh','Oral History'],]
+
+
+# lookup tables --------------------------------------------------------
+#
+# Frozen code -> label maps for the choices above, so display_* functions
+# need not scan the lists for every value.  Where a code appears twice the
+# first wins, as with a scan.
+
+def choice_labels(choices):
+    """
+    @param choices: list of [code, label]
+    @returns: MappingProxyType code -> label, in choices order
+    """
+    labels = {}
+    for code,label in choices:
+        labels.setdefault(code, label)
+    return MappingProxyType(labels)
+
+def choice_label(labels, data):
+    """Label for a code, or data itself if it is not a code
+
+    @param labels: dict code -> label (see choice_labels)
+    @param data: str
+    @returns: str
+    """
+    try:
+        return labels.get(data, data)
+    except TypeError:
+        # unhashable, so not a code
+        return data
+
+STATUS_LABELS = choice_labels(STATUS_CHOICES)
+PERMISSIONS_LABELS = choice_labels(PERMISSIONS_CHOICES)
+RIGHTS_LABELS = choice_labels(RIGHTS_CHOICES)
+GENRE_LABELS = choice_labels(GENRE_CHOICES)
+FORMAT_LABELS = choice_labels(FORMAT_CHOICES)
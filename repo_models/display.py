@@ -0,0 +1,83 @@
+"""Compiled Jinja2 templates for display_* functions
+
+DDR.converters.render() builds a jinja2.Template from its source string
+on every call, so display_creators() and friends compiled the same
+template again for every item of every record.  Here each template is
+compiled once, on first use, and kept in TEMPLATES:
+
+    >>> from repo_models import display
+    >>> display.render(TEMPLATE_EXTERNAL_URLS, data)
+    '\\n<a href="..." target="iarchive">...</a>\\n'
+    >>> display.render_list('<a href="{{ data.id }}">{{ data.term }}</a>', topics)
+    '<a href="120">Religion</a>\\n<a href="211">Art</a>'
+
+Templates see their data as `data`, as with converters.render(), and
+the environment has jinja2.Template's default settings.
+"""
+
+import jinja2
+
+
+ENVIRONMENT = jinja2.Environment()
+# _display_multiline_dict() renders only plain dicts; other items as-is
+ENVIRONMENT.tests['plaindict'] = lambda value: type(value) == type({})
+
+# source -> compiled template, for render()
+TEMPLATES = {}
+# item source -> compiled list template, for render_list()
+LIST_TEMPLATES = {}
+
+LIST_TEMPLATE = (
+    '{%% for data in items %%}'
+    '{%% if data is plaindict %%}%s{%% else %%}{{ data }}{%% endif %%}'
+    '{%% if not loop.last %%}\n{%% endif %%}'
+    '{%% endfor %%}'
+)
+
+
+def template(source):
+    """Compiled template for source, cached
+
+    @param source: str Jinja2 template
+    @returns: jinja2.Template
+    """
+    try:
+        return TEMPLATES[source]
+    except KeyError:
+        pass
+    TEMPLATES[source] = ENVIRONMENT.from_string(source)
+    return TEMPLATES[source]
+
+def render(source, data):
+    """Same output as DDR.converters.render(source, data)
+
+    @param source: str Jinja2 template
+    @param data: Passed to the template as `data`
+    @returns: str
+    """
+    return template(source).render(data=data)
+
+def render_list(source, items):
+    """Render source for each dict in items, joined with newlines
+
+    The whole list is rendered with one template call.  Items that are
+    not dicts are output unchanged, as _display_multiline_dict() does.
+
+    @param source: str Jinja2 template for one item, which it sees as `data`
+    @param items: list of dict (or str)
+    @returns: str
+    """
+    try:
+        compiled = LIST_TEMPLATES[source]
+    except KeyError:
+        # Jinja drops a single trailing newline from a template
+        if source.endswith('\r\n'):
+            body = source[:-2]
+        elif source.endswith(('\n', '\r')):
+            body = source[:-1]
+        else:
+            body = source
+        compiled = LIST_TEMPLATES[source] = ENVIRONMENT.from_string(
+            LIST_TEMPLATE % body
+        )
+    return compiled.render(items=items)
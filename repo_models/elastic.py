@@ -49,11 +49,26 @@ d.save(using=ds.es, index=ds.indexname)
 """
 
 
+import importlib
+
 import elasticsearch_dsl as dsl
 
 #from DDR.models.common import ESObject
 
-from . import collection, entity, segment, files
+from . import modelgraph
+
+
+def fields_module(model):
+    """Fields module for a model, imported on first use
+    
+    The fields modules are large; importing them here at module level
+    would load them (and DDR) in every process that imports this module.
+    
+    @param model: str
+    @returns: module
+    """
+    return importlib.import_module(modelgraph.module(model))
+
 
 # superclasses
 
@@ -271,11 +286,7 @@ class Collection(ESObject):
     
     @staticmethod
     def list_fields():
-        return [
-            field['name']
-            for field in collection.FIELDS
-            if field['elasticsearch']['public']
-        ]
+        return list(fields_module('collection').FIELDSET.public)
 
 
 class Topics(dsl.InnerDoc):
@@ -332,11 +343,7 @@ class Entity(ESCollectionObject):
     
     @staticmethod
     def list_fields():
-        return [
-            field['name']
-            for field in entity.FIELDS
-            if field['elasticsearch']['public']
-        ]
+        return list(fields_module('entity').FIELDSET.public)
 
 
 class ExternalUrls(dsl.InnerDoc):
@@ -372,11 +379,7 @@ class File(ESCollectionObject):
 
     @staticmethod
     def list_fields():
-        return [
-            field['name']
-            for field in files.FIELDS
-            if field['elasticsearch']['public']
-        ]
+        return list(fields_module('file').FIELDSET.public)
 
 
 # Help (ddr-cmdln) DDR.docstore access these classes
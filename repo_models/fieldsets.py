@@ -0,0 +1,111 @@
+"""Precomputed views of a model module's FIELDS list
+
+FIELDS is a list of dicts, and code that needs one field's definition or
+a subset of fields (public Elasticsearch fields, CSV columns, ...) would
+otherwise scan it every time.  Each model module builds a FieldSet once,
+after its FIELDS:
+
+    FIELDSET = FieldSet(MODEL, FIELDS, FIELDS_CSV_EXCLUDED, REQUIRED_FIELDS_EXCEPTIONS)
+
+and callers use its attributes:
+
+    >>> from repo_models import entity
+    >>> entity.FIELDSET['title']['form']['label']
+    'Title'
+    >>> entity.FIELDSET.public[:3]
+    ('id', 'record_created', 'record_lastmod')
+    >>> entity.FIELDSET.inherits['credit']
+    ('collection.prefercite',)
+
+Name lists are tuples in FIELDS order; field dicts are shared with FIELDS
+and must not be modified.
+"""
+
+from types import MappingProxyType
+
+
+class FieldSet(object):
+    """Field definitions by name, plus commonly used subsets of names
+
+    by_name       name -> field dict
+    names         all field names
+    public        fields with elasticsearch.public (Elasticsearch list_fields)
+    csv_export    fields exported to CSV (csv.export is not 'ignore')
+    csv_import    fields read from CSV (csv.import is not 'ignore')
+                  csv_export and csv_import leave out FIELDS_CSV_EXCLUDED
+    csv_required  fields that must be present in CSV imports
+    required      fields required in forms, less REQUIRED_FIELDS_EXCEPTIONS
+    vocab         fields whose values come from a controlled vocabulary
+    inherits      name -> tuple of 'model.field' the field inherits from
+    """
+
+    def __init__(self, model, fields, csv_excluded=[], required_exceptions=[]):
+        """
+        @param model: str
+        @param fields: list of field dicts (module FIELDS)
+        @param csv_excluded: list of names (module FIELDS_CSV_EXCLUDED)
+        @param required_exceptions: list of names (module REQUIRED_FIELDS_EXCEPTIONS)
+        """
+        self.model = model
+        self.fields = tuple(fields)
+        self.by_name = MappingProxyType({f['name']: f for f in fields})
+        self.names = tuple(f['name'] for f in fields)
+        self.csv_excluded = frozenset(csv_excluded)
+        self.public = tuple(
+            f['name'] for f in fields
+            if f['elasticsearch']['public']
+        )
+        self.csv_export = tuple(
+            f['name'] for f in fields
+            if (f['csv']['export'] != 'ignore')
+            and (f['name'] not in self.csv_excluded)
+        )
+        self.csv_import = tuple(
+            f['name'] for f in fields
+            if (f['csv']['import'] != 'ignore')
+            and (f['name'] not in self.csv_excluded)
+        )
+        self.csv_required = tuple(
+            f['name'] for f in fields
+            if f['csv']['import'] == 'require'
+        )
+        self.required = tuple(
+            f['name'] for f in fields
+            if f.get('form', {}).get('required')
+            and (f['name'] not in required_exceptions)
+        )
+        self.vocab = tuple(f['name'] for f in fields if f.get('vocab'))
+        self.inherits = MappingProxyType({
+            f['name']: tuple(f['inherits'])
+            for f in fields
+            if f.get('inherits')
+        })
+
+    def __repr__(self):
+        return '<%s.%s %s (%s fields)>' % (
+            self.__module__, self.__class__.__name__, self.model, len(self.fields)
+        )
+
+    def __getitem__(self, name):
+        return self.by_name[name]
+
+    def __contains__(self, name):
+        return name in self.by_name
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def get(self, name, default=None):
+        return self.by_name.get(name, default)
+
+    def subset(self, names):
+        """Field dicts for names, in FIELDS order
+
+        @param names: list of str
+        @returns: list of dict
+        """
+        names = set(names)
+        return [f for f in self.fields if f['name'] in names]
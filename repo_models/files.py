@@ -2,6 +2,10 @@ import logging
 logger = logging.getLogger(__name__)
 
 from DDR import converters
+from . import common
+from . import display
+from .fieldsets import FieldSet
+from .hooks import Hooks
 
 
 MODEL = 'file'
@@ -16,6 +20,10 @@ RIGHTS_CHOICES = [["cc", "DDR Creative Commons"],
                   ["pdm", "Public domain" ],]
 RIGHTS_CHOICES_DEFAULT = 'cc'
 
+# Frozen code -> label maps; see common.choice_labels
+PERMISSIONS_LABELS = common.choice_labels(PERMISSIONS_CHOICES)
+RIGHTS_LABELS = common.choice_labels(RIGHTS_CHOICES)
+
 REQUIRED_FIELDS_EXCEPTIONS = ['sha1', 'sha256', 'md5', 'size', 'access_rel', 'xmp', 'links']
 
 
@@ -587,6 +595,9 @@ FIELDS_NEW = [field for field in FIELDS if field['name'] in newfile_fields]
 # List of FIELDS to be excluded when exporting and updating.
 FIELDS_CSV_EXCLUDED = ['role','size','access_rel','sha1','sha256','md5','xmp']
 
+# Precomputed views of FIELDS; see fieldsets.FieldSet.
+FIELDSET = FieldSet(MODEL, FIELDS, FIELDS_CSV_EXCLUDED, REQUIRED_FIELDS_EXCEPTIONS)
+
 
 # jsonload_* --- load-from-json functions ----------------------------
 #
@@ -611,16 +622,10 @@ def jsondump_external(data): return converters.text_to_boolean(data)
 #
 
 def display_public( data ):
-    for c in PERMISSIONS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(PERMISSIONS_LABELS, data)
 
 def display_rights( data ):
-    for c in RIGHTS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(RIGHTS_LABELS, data)
 
 def display_sort( data ):
     return ''
@@ -635,7 +640,7 @@ TEMPLATE_EXTERNAL_URLS = """
 """
 
 def display_external_urls(data):
-    return converters.render(TEMPLATE_EXTERNAL_URLS, data)
+    return display.render(TEMPLATE_EXTERNAL_URLS, data)
 
 def display_links( data ):
     return ''
@@ -795,3 +800,13 @@ def csvdump_external_urls(data):
 #def csvdump_creators(data): return csv.dump_rolepeople(data)
 #def csvdump_language(data): return csv.dump_labelledlist(data)
 #def csvdump_topics(data): return csv.dump_list(data)
+
+
+
+# hook tables ---------------------------------------------------------
+#
+# Functions above by family and field name; see hooks.Hooks.
+# Keep this at the end of the module, after all hook functions.
+#
+
+HOOKS = Hooks(globals(), FIELDSET.names)
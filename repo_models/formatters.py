@@ -0,0 +1,144 @@
+"""Build IDs, paths and URLs from parts using IDENTIFIERS templates
+
+Each template in IDENTIFIERS[n]['templates'] is compiled once, at import,
+into a small generated function so that building an ID or URL for every
+object in a collection does not re-parse format strings.
+
+When a model has several templates for the same purpose (e.g. file IDs
+with and without a segment), the first template whose distinguishing
+components are all present in the parts is used.  If the parts lack a
+component that template needs, the result is None.  Templates that
+start with {basepath} raise an Exception when no basepath is given.
+
+    >>> from repo_models import formatters
+    >>> parts = {'repo':'ddr', 'org':'densho', 'cid':10, 'eid':5}
+    >>> formatters.format_id('entity', parts)
+    'ddr-densho-10-5'
+    >>> formatters.format_path('entity', parts, 'abs', '/var/www/media/ddr')
+    '/var/www/media/ddr/ddr-densho-10/files/ddr-densho-10-5'
+    >>> formatters.format_url('entity', parts, 'public')
+    '/ddr/densho/10/5'
+"""
+
+from string import Formatter
+
+from .identifier import IDENTIFIERS
+
+
+# (kind, subkind) for each list of templates under 'templates'
+TEMPLATE_KINDS = [
+    ('id', None),
+    ('path', 'rel'),
+    ('path', 'abs'),
+    ('url', 'editor'),
+    ('url', 'public'),
+]
+
+
+def _compile_template(template):
+    """Generate a function that formats template the way str.format does
+
+    @param template: str e.g. '{repo}-{org}-{cid}'
+    @returns: (fields, function(parts, basepath)) tuple
+    """
+    fields = []
+    pieces = []
+    for literal,field,spec,conversion in Formatter().parse(template):
+        if literal:
+            pieces.append(repr(literal))
+        if field is None:
+            continue
+        if spec or conversion or not field.isidentifier():
+            raise Exception('Unsupported template field "%s" in %s' % (field, template))
+        fields.append(field)
+        if field == 'basepath':
+            pieces.append('f"{basepath}"')
+        else:
+            pieces.append('f"{p[%r]}"' % field)
+    lines = ['def build(p, basepath=None):']
+    if 'basepath' in fields:
+        lines.append('    if basepath is None:')
+        lines.append('        raise Exception(%r)' % ('basepath is required for %s' % template))
+    lines.append('    return %s' % (' '.join(pieces) or "''"))
+    source = '\n'.join(lines)
+    namespace = {}
+    exec(source, namespace)
+    return tuple(fields),namespace['build']
+
+def _compile_templates(templates):
+    """Compile a list of alternative templates
+
+    Each template is paired with the components that distinguish it
+    from the templates listed after it.
+
+    @param templates: list of str
+    @returns: list of (required, function) tuples
+    """
+    compiled = [_compile_template(template) for template in templates]
+    common = set(compiled[0][0]) if compiled else set()
+    for fields,build in compiled:
+        common &= set(fields)
+    return [
+        (tuple(f for f in fields if (f not in common) and (f != 'basepath')), build)
+        for fields,build in compiled
+    ]
+
+def _templates(identifier, kind, subkind):
+    templates = identifier['templates'][kind]
+    if subkind:
+        templates = templates[subkind]
+    return templates
+
+
+FORMATTERS = {
+    (i['model'], kind, subkind): _compile_templates(_templates(i, kind, subkind))
+    for i in IDENTIFIERS
+    for kind,subkind in TEMPLATE_KINDS
+}
+
+
+def _format(key, parts, basepath=None):
+    for required,build in FORMATTERS[key]:
+        for field in required:
+            if parts.get(field) in (None, ''):
+                break
+        else:
+            try:
+                return build(parts, basepath)
+            except KeyError:
+                # a component the template needs is absent
+                return None
+    return None
+
+def format_id(model, parts):
+    """Format an object ID
+
+    @param model: str
+    @param parts: dict of identifier components
+    @returns: str or None if model has no matching template or parts
+        lack a component
+    """
+    return _format((model, 'id', None), parts)
+
+def format_path(model, parts, subkind, basepath=None):
+    """Format an absolute or relative path to an object
+
+    @param model: str
+    @param parts: dict of identifier components
+    @param subkind: str 'abs' or 'rel'
+    @param basepath: str Required for absolute paths
+    @returns: str or None if model has no matching template or parts
+        lack a component
+    """
+    return _format((model, 'path', subkind), parts, basepath)
+
+def format_url(model, parts, subkind):
+    """Format an editor or public URL for an object
+
+    @param model: str
+    @param parts: dict of identifier components
+    @param subkind: str 'editor' or 'public'
+    @returns: str or None if model has no matching template or parts
+        lack a component
+    """
+    return _format((model, 'url', subkind), parts)
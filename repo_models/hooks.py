@@ -0,0 +1,98 @@
+"""Per-field hook tables for a model module
+
+Model modules define optional per-field functions named by family and
+field, e.g. jsonload_record_created() or index_record_lastmod().  Looking
+them up with hasattr(module, 'index_%s' % fieldname) builds a string and
+searches the module for every field of every document.  Instead, each
+model module builds its tables once, at the bottom of the module:
+
+    HOOKS = Hooks(globals(), FIELDSET.names)
+
+    >>> from repo_models import entity
+    >>> entity.HOOKS['jsonload']['record_created']
+    <function jsonload_record_created at ...>
+    >>> entity.HOOKS['jsonload']['title'] is hooks.identity
+    True
+    >>> entity.HOOKS.convert('index', document_dict)
+    {'id': ..., 'record_created': ..., ...}
+
+As with DDR.modules.Module.function(), a field without a hook gets its
+value back unchanged.
+"""
+
+from types import MappingProxyType
+
+
+HOOK_FAMILIES = [
+    'jsonload', 'jsondump',
+    'display', 'index',
+    'formprep', 'formpost',
+    'csvvalidate', 'csvload', 'csvdump',
+]
+
+
+def identity(data):
+    return data
+
+
+class Hooks(object):
+    """Hook functions by family and field name
+
+    hooks[family]          field name -> function, identity if none defined
+    hooks.pairs[family]    (name, function) for every field, in FIELDS order
+    hooks.defined[family]  (name, function) for fields with a hook only
+    """
+
+    def __init__(self, namespace, names):
+        """
+        @param namespace: dict Module globals()
+        @param names: list of field names in FIELDS order
+        """
+        found = {family: {} for family in HOOK_FAMILIES}
+        for key,value in namespace.items():
+            if key.startswith('_') or not callable(value):
+                continue
+            family,sep,name = key.partition('_')
+            if sep and name and (family in found):
+                found[family][name] = value
+        self.names = tuple(names)
+        self.tables = {}
+        self.pairs = {}
+        self.defined = {}
+        for family,functions in found.items():
+            table = {name: functions.get(name, identity) for name in names}
+            # hooks for names that are not fields (e.g. formprep_parent)
+            table.update(functions)
+            self.tables[family] = MappingProxyType(table)
+            self.pairs[family] = tuple(
+                (name, table[name]) for name in names
+            )
+            self.defined[family] = tuple(
+                (name, table[name]) for name in names
+                if name in functions
+            )
+
+    def __getitem__(self, family):
+        return self.tables[family]
+
+    def get(self, family, name):
+        """Hook function for a field, identity if none is defined
+
+        @param family: str e.g. 'jsonload'
+        @param name: str Field name
+        @returns: function
+        """
+        return self.tables[family].get(name, identity)
+
+    def convert(self, family, data):
+        """Apply family's hooks to each field present in data
+
+        @param family: str e.g. 'index'
+        @param data: dict field name -> value
+        @returns: dict of the fields in data, in FIELDS order
+        """
+        return {
+            name: fn(data[name])
+            for name,fn in self.pairs[family]
+            if name in data
+        }
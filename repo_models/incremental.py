@@ -0,0 +1,279 @@
+"""Incremental reindexing
+
+A full reindex loads, serializes and sends every object in the
+repository.  IncrementalIndexer keeps a small sqlite database of what
+was last sent for each ID and only sends documents that changed:
+
+    >>> from repo_models import bulk, incremental, walker
+    >>> transport = bulk.HttpTransport('http://192.168.56.1:9200')
+    >>> with bulk.BulkIndexer(transport, 'ddr{model}') as indexer:
+    ...     with incremental.IncrementalIndexer(indexer, '/var/lib/ddr/index.db',
+    ...                                         scope='ddr-densho-10') as inc:
+    ...         for record in walker.walk('/var/www/media/ddr/ddr-densho-10'):
+    ...             inc.index_record(record, load)
+    >>> inc.stats
+    {'seen': 20408, 'unchanged': 20391, 'loaded': 17, 'indexed': 4, 'deleted': 1}
+
+For each object there are two checks, cheapest first:
+
+- the JSON file's mtime and size (from the walker Record, no load)
+- a hash of the serialized document (after loading and serializing)
+
+An object that fails both is indexed.  record_lastmod and sha1 are
+stored for reference but not trusted: files can be edited without
+bumping record_lastmod.  IDs in the state store that were not seen
+during the run, within `scope`, are deleted from the index and from the
+store.  Deletes are only done for a scoped run unless delete=True is
+given, since an unscoped run over one collection would otherwise delete
+every other collection.  State is written after each chunk is sent, and IDs
+whose bulk actions failed keep their previous state so they are retried
+on the next run.
+"""
+
+import hashlib
+import logging
+logger = logging.getLogger(__name__)
+import os
+import sqlite3
+
+from . import serializers
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    mtime INTEGER,
+    size INTEGER,
+    lastmod TEXT,
+    hash TEXT,
+    doc_hash TEXT,
+    run INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run INTEGER PRIMARY KEY AUTOINCREMENT,
+    scope TEXT
+);
+"""
+
+# Pending state is written to the store this often
+SYNC_EVERY = 5000
+
+
+def _lastmod(document):
+    value = getattr(document, 'record_lastmod', None)
+    if value is None:
+        return None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+class StateStore(object):
+    """sqlite database of ID -> what was last sent to the index
+    """
+
+    def __init__(self, path):
+        """
+        @param path: str Database file, created if necessary
+        """
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+
+    def close(self):
+        self.db.close()
+
+    def begin(self, scope=None):
+        """Start a run
+
+        @param scope: str Collection ID or None
+        @returns: int Run number
+        """
+        with self.db:
+            cursor = self.db.execute('INSERT INTO runs (scope) VALUES (?)', (scope,))
+        return cursor.lastrowid
+
+    def get(self, oid):
+        """
+        @param oid: str
+        @returns: (model, mtime, size, lastmod, hash, doc_hash) or None
+        """
+        return self.db.execute(
+            'SELECT model, mtime, size, lastmod, hash, doc_hash'
+            ' FROM documents WHERE id = ?', (oid,)
+        ).fetchone()
+
+    def write(self, run, rows, touched):
+        """Store changed rows and mark unchanged IDs as seen, in one transaction
+
+        @param run: int
+        @param rows: list of (id, model, mtime, size, lastmod, hash, doc_hash)
+        @param touched: list of IDs
+        """
+        with self.db:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO documents'
+                ' (id, model, mtime, size, lastmod, hash, doc_hash, run)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?, %d)' % run,
+                rows
+            )
+            self.db.executemany(
+                'UPDATE documents SET run = %d WHERE id = ?' % run,
+                [(oid,) for oid in touched]
+            )
+
+    def vanished(self, run, scope=None):
+        """IDs not seen since before run
+
+        @param run: int
+        @param scope: str Only IDs equal to scope or starting with scope-
+        @returns: list of (id, model)
+        """
+        if scope:
+            return self.db.execute(
+                'SELECT id, model FROM documents WHERE run < ?'
+                ' AND (id = ? OR substr(id, 1, ?) = ?)',
+                (run, scope, len(scope) + 1, scope + '-')
+            ).fetchall()
+        return self.db.execute(
+            'SELECT id, model FROM documents WHERE run < ?', (run,)
+        ).fetchall()
+
+    def remove(self, oids):
+        with self.db:
+            self.db.executemany(
+                'DELETE FROM documents WHERE id = ?', [(oid,) for oid in oids]
+            )
+
+
+class IncrementalIndexer(object):
+    """Send only changed documents, and deletes for vanished ones,
+    to a bulk.BulkIndexer
+    """
+
+    def __init__(self, indexer, state, scope=None, delete=None):
+        """
+        @param indexer: bulk.BulkIndexer
+        @param state: str sqlite path, or StateStore
+        @param scope: str Collection ID; deletes are limited to its objects
+        @param delete: boolean Delete vanished IDs when finished;
+            default True if scope is given, else False
+        """
+        self.indexer = indexer
+        if isinstance(state, StateStore):
+            self.state = state
+        else:
+            self.state = StateStore(state)
+        self.scope = scope
+        if delete is None:
+            delete = bool(scope)
+        self.delete = delete
+        self.run = self.state.begin(scope)
+        self.rows = []
+        self.touched = []
+        self.errors = len(indexer.errors)
+        self.stats = {'seen': 0, 'unchanged': 0, 'loaded': 0, 'indexed': 0, 'deleted': 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.finish()
+
+    def index_record(self, record, load):
+        """Index a walker Record if its JSON file or content changed
+
+        @param record: walker.Record
+        @param load: function(record) -> object with .identifier
+        """
+        try:
+            st = os.stat(record.path)
+        except FileNotFoundError:
+            # not marked as seen, so it is deleted from the index
+            return
+        self.stats['seen'] += 1
+        row = self.state.get(record.id)
+        if row and (row[1] == st.st_mtime_ns) and (row[2] == st.st_size):
+            self._unchanged(record.id)
+            return
+        self.stats['loaded'] += 1
+        document = load(record)
+        self._index(document, record.parts, row, st.st_mtime_ns, st.st_size)
+
+    def index_object(self, document, parts=None):
+        """Index a loaded object if its content changed
+
+        @param document: object with .identifier
+        @param parts: dict or IdParts; default document.identifier.parts
+        """
+        self.stats['seen'] += 1
+        row = self.state.get(document.identifier.id)
+        self._index(document, parts, row, None, None)
+
+    def _unchanged(self, oid, row=None):
+        """Count an unchanged ID; row updates its stored state"""
+        self.stats['unchanged'] += 1
+        if row:
+            self.rows.append(row)
+        else:
+            self.touched.append(oid)
+        if len(self.rows) + len(self.touched) >= SYNC_EVERY:
+            self.sync()
+
+    def _index(self, document, parts, row, mtime, size):
+        identifier = document.identifier
+        oid = identifier.id
+        model = identifier.model
+        lastmod = _lastmod(document)
+        sha1 = getattr(document, 'sha1', None)
+        if parts is None:
+            parts = identifier.parts
+        source = serializers.serializer(model)(document, parts)
+        action = self.indexer._action(model, oid, source)
+        doc_hash = hashlib.sha1(action[1]).hexdigest()
+        new_row = (oid, model, mtime, size, lastmod, sha1, doc_hash)
+        if row and (row[5] == doc_hash):
+            # store the new mtime so the next run can skip the load
+            self._unchanged(oid, new_row)
+            return
+        self.stats['indexed'] += 1
+        self.indexer._queue(action)
+        self.rows.append(new_row)
+        if len(self.rows) + len(self.touched) >= SYNC_EVERY:
+            self.sync()
+
+    def _failed(self):
+        """Send queued actions; IDs whose actions failed since the last call"""
+        self.indexer.flush()
+        errors = self.indexer.errors[self.errors:]
+        self.errors = len(self.indexer.errors)
+        return set(
+            result.get('_id')
+            for item in errors
+            for result in item.values()
+        )
+
+    def sync(self):
+        """Send queued actions and write state for the IDs that succeeded"""
+        failed = self._failed()
+        rows = [row for row in self.rows if row[0] not in failed]
+        touched = self.touched + [row[0] for row in self.rows if row[0] in failed]
+        self.state.write(self.run, rows, touched)
+        self.rows = []
+        self.touched = []
+
+    def finish(self):
+        """Write remaining state and delete vanished IDs"""
+        self.sync()
+        if self.delete:
+            vanished = self.state.vanished(self.run, self.scope)
+            for oid,model in vanished:
+                self.indexer.delete(model, oid)
+            failed = self._failed()
+            self.state.remove([oid for oid,model in vanished if oid not in failed])
+            self.stats['deleted'] += len([oid for oid,model in vanished if oid not in failed])
+        logger.info('incremental index: %s' % self.stats)
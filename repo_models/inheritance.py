@@ -0,0 +1,154 @@
+"""Propagate inherited field values to descendants in bulk
+
+Fields declare the ancestor fields they inherit from, e.g. files.public:
+
+    'inherits': ['collection.public', 'entity.public', 'segment.public'],
+
+When an ancestor's value changes, every descendant whose field inherits
+it gets the new value.  Rather than loading and saving each descendant
+object, propagate() walks the object's directory once, edits the raw
+JSON of the descendants that need it, writes them as one batch
+(objectfiles.write_many), and queues one partial update per changed
+document on a bulk indexer:
+
+    >>> from repo_models import bulk, inheritance
+    >>> transport = bulk.HttpTransport('http://192.168.56.1:9200')
+    >>> with bulk.BulkIndexer(transport, 'ddr{model}') as indexer:
+    ...     changed = inheritance.propagate(
+    ...         '/var/www/media/ddr/ddr-densho-10', {'public': '1'}, indexer)
+    >>> len(changed)
+    20407
+
+Values are given as they appear in the JSON files (jsondump form).
+Descendants whose values are already current are not rewritten.  Those
+that are rewritten get a new record_lastmod, as when DDR saves them, and
+it is included in their partial update.  The indexer must be a blocking
+bulk.BulkIndexer; if any update fails, an exception is raised after the
+files are written.
+"""
+
+from collections import defaultdict
+import asyncio
+import importlib
+
+from . import modelgraph
+from . import objectfiles
+from . import serializers
+from . import walker
+
+
+def _fieldsets():
+    """model -> FieldSet, for models with fields modules"""
+    return {
+        model: importlib.import_module(modelgraph.module(model)).FIELDSET
+        for model in modelgraph.MODELS
+        if modelgraph.module(model)
+    }
+
+def inheritors():
+    """Who inherits each ancestor field
+
+    @returns: dict (model, field) -> list of (descendant model, field)
+    """
+    found = defaultdict(list)
+    for model,fieldset in _fieldsets().items():
+        for name,sources in fieldset.inherits.items():
+            for source in sources:
+                smodel,sfield = source.split('.')
+                found[(smodel, sfield)].append((model, name))
+    return dict(found)
+
+def plan(model, values):
+    """Field values to set on each descendant model
+
+    @param model: str Model of the changed object
+    @param values: dict Field name -> new value
+    @returns: dict descendant model -> {field: value}
+    """
+    table = inheritors()
+    changes = defaultdict(dict)
+    for field,value in values.items():
+        for dmodel,dfield in table.get((model, field), []):
+            changes[dmodel][dfield] = value
+    return dict(changes)
+
+def _index_doc(properties, hooks, values):
+    """Elasticsearch fields for JSON field values
+
+    Only fields the serializer writes (see serializers.compile_serializer)
+    are included.
+
+    @param properties: dict Mapping properties of the model's document
+    @param hooks: hooks.Hooks
+    @param values: dict Field name -> value in JSON form
+    @returns: dict
+    """
+    return {
+        name: hooks['index'][name](hooks['jsonload'][name](value))
+        for name,value in values.items()
+        if (name in properties) and (name not in serializers.FROM_IDENTIFIER)
+    }
+
+def _lastmod(fieldset, hooks):
+    """{'record_lastmod': now} in JSON form, or {} if the model has none"""
+    if 'record_lastmod' not in fieldset:
+        return {}
+    # formprep_record_lastmod(None) is now, in DDR's timezone
+    now = hooks['formprep']['record_lastmod'](None)
+    return {'record_lastmod': hooks['jsondump']['record_lastmod'](now)}
+
+def propagate(path, values, indexer=None, write=True):
+    """Set inherited values on every descendant of an object
+
+    @param path: str Directory of the changed collection, entity or segment
+    @param values: dict Field name -> new value, in JSON form
+    @param indexer: bulk.BulkIndexer or None
+    @param write: boolean Write JSON files (False to only update the index)
+    @returns: list of walker.Record for descendants that changed
+    """
+    if (indexer is not None) and asyncio.iscoroutinefunction(indexer.update):
+        raise Exception('propagate() needs a blocking indexer, not %s' % indexer)
+    records = walker.walk(path)
+    this = next(records)
+    changes = plan(this.model, values)
+    if not changes:
+        return []
+    fieldsets = _fieldsets()
+    modules = {
+        model: importlib.import_module(modelgraph.module(model))
+        for model in changes
+    }
+    lastmods = {
+        model: _lastmod(fieldsets[model], modules[model].HOOKS)
+        for model in changes
+    }
+    changed = []
+    writes = []
+    for record in records:
+        updates = changes.get(record.model)
+        if not updates:
+            continue
+        data = objectfiles.read(record.path)
+        names = fieldsets[record.model].names
+        if objectfiles.update(data, updates, names):
+            objectfiles.update(data, lastmods[record.model], names)
+            changed.append(record)
+            writes.append((record.path, data))
+    if write:
+        objectfiles.write_many(writes)
+    if indexer is not None:
+        docs = {}
+        for model,updates in changes.items():
+            updates = dict(updates, **lastmods[model])
+            docs[model] = _index_doc(
+                serializers.model_properties(model), modules[model].HOOKS, updates
+            )
+        errors = len(indexer.errors)
+        for record in changed:
+            if docs[record.model]:
+                indexer.update(record.model, record.id, docs[record.model])
+        indexer.flush()
+        if len(indexer.errors) > errors:
+            raise Exception('%s of %s partial updates failed, see indexer.errors' % (
+                len(indexer.errors) - errors, len(changed)))
+    return changed
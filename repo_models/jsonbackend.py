@@ -0,0 +1,135 @@
+"""JSON parsing and DDR-format serialization with an optional fast backend
+
+Object files are git-tracked, so they must be written exactly as DDR
+writes them:
+
+    json.dumps(data, indent=4, separators=(',', ': '), sort_keys=True)
+
+With indent set, the stdlib encoder falls back to pure Python.  When
+orjson is installed it is used for both parsing and serializing, and
+its output is adjusted to match the stdlib's byte for byte (four-space
+indent, \\uXXXX escapes for non-ASCII).  Data orjson would format
+differently (floats, non-string keys, integers over 64 bits, types the
+stdlib cannot serialize) is handed to the stdlib instead.
+
+    >>> from repo_models import jsonbackend
+    >>> jsonbackend.BACKEND
+    'orjson'
+    >>> text = jsonbackend.dumps(data)
+    >>> jsonbackend.loads(text) == data
+    True
+
+Set REPO_MODELS_JSON=json to use the stdlib only, or call use('json').
+"""
+
+import codecs
+import json
+import os
+
+
+def _json_dumps(data):
+    return json.dumps(data, indent=4, separators=(',', ': '), sort_keys=True)
+
+_json_loads = json.loads
+
+
+# orjson ---------------------------------------------------------------
+
+# orjson parses integers over 64 bits as floats, so text with a run of
+# 19 or more digits is parsed by the stdlib.  Digits -> '0', others -> ' '
+_DIGITS = bytes((48 if 48 <= n <= 57 else 32) for n in range(256))
+_LONG_RUN = b'0' * 19
+
+def _has_float(data):
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        t = type(value)
+        if t is float:
+            return True
+        if (t is list) or (t is tuple):
+            stack.extend(value)
+        elif t is dict:
+            stack.extend(value.values())
+    return False
+
+def _ascii_escape(error):
+    """codecs error handler: \\uXXXX escapes, as json.dumps(ensure_ascii=True)"""
+    escapes = []
+    for c in error.object[error.start:error.end]:
+        n = ord(c)
+        if n < 0x10000:
+            escapes.append('\\u%04x' % n)
+        else:
+            n -= 0x10000
+            escapes.append('\\u%04x\\u%04x' % (0xd800 | (n >> 10), 0xdc00 | (n & 0x3ff)))
+    return ''.join(escapes), error.end
+
+codecs.register_error('repo_models.jsonbackend', _ascii_escape)
+
+def _orjson_loads(text):
+    data = text
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    if _LONG_RUN in data.translate(_DIGITS):
+        return json.loads(text)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # NaN and Infinity, or a real error
+        return json.loads(text)
+
+def _orjson_dumps(data):
+    if _has_float(data):
+        # float formatting differs (1e+16 vs 1e16, NaN vs null)
+        return _json_dumps(data)
+    try:
+        raw = orjson.dumps(data, option=_ORJSON_OPTIONS)
+    except orjson.JSONEncodeError:
+        return _json_dumps(data)
+    # orjson indents by two spaces.  At step k every line indented
+    # 2k or more spaces by orjson gets two more: 2d + 2d = 4d at depth d.
+    k = 1
+    while (b'\n' + b' ' * (4 * k - 2)) in raw:
+        raw = raw.replace(b'\n' + b' ' * (4 * k - 2), b'\n' + b' ' * (4 * k))
+        k += 1
+    text = raw.decode('utf-8')
+    if not text.isascii():
+        text = text.encode('ascii', 'repo_models.jsonbackend').decode('ascii')
+    if '\x7f' in text:
+        text = text.replace('\x7f', '\\u007f')
+    return text
+
+try:
+    import orjson
+    _ORJSON_OPTIONS = (
+        orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        # raise like the stdlib instead of serializing these
+        | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    )
+except ImportError:
+    orjson = None
+
+
+BACKENDS = {
+    'json': (_json_loads, _json_dumps),
+}
+if orjson:
+    BACKENDS['orjson'] = (_orjson_loads, _orjson_dumps)
+
+BACKEND = None
+loads = None
+dumps = None
+
+def use(name):
+    """Select a backend
+
+    @param name: str 'json' or 'orjson'
+    """
+    global BACKEND, loads, dumps
+    if name not in BACKENDS:
+        raise Exception('JSON backend not available: %s' % name)
+    BACKEND = name
+    loads,dumps = BACKENDS[name]
+
+use(os.environ.get('REPO_MODELS_JSON') or ('orjson' if orjson else 'json'))
@@ -0,0 +1,92 @@
+"""Ancestor chains computed from a single parsed identifier
+
+An object's ancestors are the prefixes of its identifier components:
+ddr-densho-10-5-master-a1b2c3d4e5 (file) has file-role ddr-densho-10-5-master,
+entity ddr-densho-10-5, collection ddr-densho-10, and so on.  The model of
+each prefix is the model whose component comes last in it.
+
+Lineages are cached per prefix, so every file under an entity shares the
+entity's cached chain and only adds its own entry.
+
+    >>> from repo_models import lineage, resolver
+    >>> model,parts = resolver.resolve('ddr-densho-10-5-master-a1b2c3d4e5', 'id')
+    >>> [a.id for a in lineage.lineage(parts)]
+    ['ddr-densho-10-5-master-a1b2c3d4e5', 'ddr-densho-10-5', 'ddr-densho-10']
+    >>> lineage.parent_id(parts), lineage.collection_id(parts)
+    ('ddr-densho-10-5', 'ddr-densho-10')
+
+Entries are Ancestor(id, model, idpart); use ._asdict() for ESLineage.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+from .formatters import format_id
+from .modelgraph import MODELS_BY_COMPONENT, STUBS
+from .parts import COMPONENTS, IdParts
+
+
+Ancestor = namedtuple('Ancestor', ['id', 'model', 'idpart'])
+
+
+@lru_cache(maxsize=65536)
+def _lineage(values):
+    """Full lineage, stubs included, for a tuple of component values
+
+    @param values: tuple Component values in COMPONENTS order, None where
+        absent, with the last present component being the object's own.
+    @returns: tuple of Ancestor, object first
+    """
+    present = [n for n,value in enumerate(values) if value is not None]
+    last = present[-1]
+    model = MODELS_BY_COMPONENT[COMPONENTS[last]]['model']
+    parts = {COMPONENTS[n]: values[n] for n in present}
+    this = Ancestor(format_id(model, parts), model, str(values[last]))
+    if len(present) == 1:
+        return (this,)
+    parent = values[:last] + (None,) * (len(values) - last)
+    return (this,) + _lineage(parent)
+
+@lru_cache(maxsize=65536)
+def _lineage_nostubs(values):
+    return tuple(a for a in _lineage(values) if a.model not in STUBS)
+
+def _values(parts):
+    if isinstance(parts, IdParts):
+        return parts.values_tuple()
+    return tuple(parts.get(name) or None for name in COMPONENTS)
+
+def lineage(parts, stubs=False):
+    """Object and its ancestors, nearest first
+
+    @param parts: dict or IdParts
+    @param stubs: boolean Include stub models (repository, organization,
+        file-role)
+    @returns: tuple of Ancestor
+    """
+    if stubs:
+        return _lineage(_values(parts))
+    return _lineage_nostubs(_values(parts))
+
+def parent_id(parts, stubs=False):
+    """ID of the object's parent, or None for the top of the lineage
+
+    @param parts: dict or IdParts
+    @param stubs: boolean Count stub models as parents
+    @returns: str or None
+    """
+    chain = lineage(parts, stubs)
+    if len(chain) > 1:
+        return chain[1].id
+    return None
+
+def collection_id(parts):
+    """ID of the collection containing the object (or the object itself)
+
+    @param parts: dict or IdParts
+    @returns: str or None if parts are above collection level
+    """
+    for a in _lineage(_values(parts)):
+        if a.model == 'collection':
+            return a.id
+    return None
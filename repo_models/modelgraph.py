@@ -0,0 +1,145 @@
+"""Import-time index of the models declared in IDENTIFIERS
+
+Lookups by model name, level and component name are dicts instead of
+scans of the IDENTIFIERS list, and parent/child relations form a frozen
+graph.  The declarations are validated when this module is imported, so
+an inconsistent IDENTIFIERS fails at startup rather than mid-reindex.
+
+    >>> from repo_models import modelgraph
+    >>> modelgraph.MODELS_BY_NAME['entity']['level']
+    1
+    >>> modelgraph.MODELS_BY_COMPONENT['sid']['model']
+    'segment'
+    >>> modelgraph.CHILDREN_ALL['entity']
+    ('segment', 'file-role')
+"""
+
+from types import MappingProxyType
+
+from .identifier import IDENTIFIERS
+
+
+STUB_CLASS = 'DDR.models.Stub'
+
+RELATIONS = ['parents', 'parents_all', 'children', 'children_all']
+
+
+def validate(identifiers):
+    """Check that IDENTIFIERS declarations are mutually consistent
+
+    - model names, levels and component names are unique
+    - every model named in parents/children is declared
+    - parents_all and children_all mirror each other exactly
+    - 'parents' of a model list it in their 'children'
+      (stubs' own 'children' are not checked; 'parents' skips stubs)
+    - 'children' of a non-stub model list it in their 'parents'
+    - parents have lower levels than their children
+
+    @param identifiers: list of dicts in IDENTIFIERS format
+    @returns: list of error messages, empty if all is well
+    """
+    errors = []
+    by_name = {}
+    for key in ['model', 'level']:
+        seen = set()
+        for i in identifiers:
+            if i[key] in seen:
+                errors.append('Duplicate %s "%s"' % (key, i[key]))
+            seen.add(i[key])
+    seen = set()
+    for i in identifiers:
+        name = i['component']['name']
+        if name in seen:
+            errors.append('Duplicate component "%s"' % name)
+        seen.add(name)
+        by_name[i['model']] = i
+    for i in identifiers:
+        model = i['model']
+        for relation in RELATIONS:
+            for other in i[relation]:
+                if other not in by_name:
+                    errors.append('%s.%s: unknown model "%s"' % (model, relation, other))
+    if errors:
+        return errors
+    for i in identifiers:
+        model = i['model']
+        for parent in i['parents_all']:
+            if model not in by_name[parent]['children_all']:
+                errors.append('%s.parents_all has "%s" but %s.children_all lacks "%s"' % (
+                    model, parent, parent, model))
+        for child in i['children_all']:
+            if model not in by_name[child]['parents_all']:
+                errors.append('%s.children_all has "%s" but %s.parents_all lacks "%s"' % (
+                    model, child, child, model))
+        for parent in i['parents']:
+            if model not in by_name[parent]['children']:
+                errors.append('%s.parents has "%s" but %s.children lacks "%s"' % (
+                    model, parent, parent, model))
+        if i['class'] != STUB_CLASS:
+            for child in i['children']:
+                if model not in by_name[child]['parents']:
+                    errors.append('%s.children has "%s" but %s.parents lacks "%s"' % (
+                        model, child, child, model))
+        for relation in ['parents', 'parents_all']:
+            for parent in i[relation]:
+                if by_name[parent]['level'] >= i['level']:
+                    errors.append('%s.%s: "%s" is not at a lower level' % (
+                        model, relation, parent))
+    return errors
+
+
+_errors = validate(IDENTIFIERS)
+if _errors:
+    raise Exception('Invalid IDENTIFIERS:\n%s' % '\n'.join(_errors))
+
+
+MODELS = tuple(i['model'] for i in IDENTIFIERS)
+MODEL_INDEX = MappingProxyType({model: n for n,model in enumerate(MODELS)})
+
+MODELS_BY_NAME = MappingProxyType({i['model']: i for i in IDENTIFIERS})
+MODELS_BY_LEVEL = MappingProxyType({i['level']: i for i in IDENTIFIERS})
+MODELS_BY_COMPONENT = MappingProxyType(
+    {i['component']['name']: i for i in IDENTIFIERS}
+)
+
+STUBS = frozenset(i['model'] for i in IDENTIFIERS if i['class'] == STUB_CLASS)
+
+# adjacency: model -> tuple of models
+PARENTS = MappingProxyType({i['model']: tuple(i['parents']) for i in IDENTIFIERS})
+PARENTS_ALL = MappingProxyType({i['model']: tuple(i['parents_all']) for i in IDENTIFIERS})
+CHILDREN = MappingProxyType({i['model']: tuple(i['children']) for i in IDENTIFIERS})
+CHILDREN_ALL = MappingProxyType({i['model']: tuple(i['children_all']) for i in IDENTIFIERS})
+
+
+def level(model):
+    return MODELS_BY_NAME[model]['level']
+
+def component(model):
+    """Name of the identifier component a model adds, e.g. 'eid'"""
+    return MODELS_BY_NAME[model]['component']['name']
+
+def module(model):
+    """Dotted name of the model's fields module, '' for stubs"""
+    return MODELS_BY_NAME[model]['module']
+
+def elastic_class(model):
+    """Dotted name of the model's Elasticsearch class, '' if none"""
+    return MODELS_BY_NAME[model]['elastic_class']
+
+def is_stub(model):
+    return model in STUBS
+
+def descendants(model):
+    """All models below model in the children_all graph, nearest first
+
+    @param model: str
+    @returns: tuple of str
+    """
+    found = []
+    queue = list(CHILDREN_ALL[model])
+    while queue:
+        child = queue.pop(0)
+        if child not in found:
+            found.append(child)
+            queue.extend(CHILDREN_ALL[child])
+    return tuple(found)
@@ -0,0 +1,194 @@
+"""Read and write object JSON files without instantiating objects
+
+An object's JSON file is a list: a dict of application metadata
+followed by one single-key dict per field, in FIELDS order.
+
+    [
+        {"application": "https://github.com/densho/ddr-cmdln.git", ...},
+        {"id": "ddr-densho-10-5"},
+        {"record_created": "2017-11-01T12:34:56"},
+        ...
+    ]
+
+Values are as written by the jsondump_* hooks.  dumps() produces the
+same text as DDR (with orjson if available, see jsonbackend), so rewriting an unchanged file leaves it unchanged.
+
+    >>> from repo_models import objectfiles
+    >>> data = objectfiles.read(path)
+    >>> objectfiles.fields(data)['public']
+    '0'
+    >>> objectfiles.update(data, {'public': '1'}, entity.FIELDSET.names)
+    True
+    >>> objectfiles.write_many([(path, data)])
+    1
+
+load_many() reads many objects' files on a thread pool and converts
+them with the model modules' jsonload_* hooks, yielding each object's
+fields as it is ready:
+
+    >>> for record,values in objectfiles.load_many(walker.walk(cpath)):
+    ...     indexer.index(record.model, record.id, values)
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import importlib
+import os
+
+from . import jsonbackend
+from . import modelgraph
+
+
+WORKERS = 8
+MAX_PENDING = 64
+
+
+def read(path):
+    """
+    @param path: str Absolute path to an object's JSON file
+    @returns: list
+    """
+    with open(path, 'rb') as f:
+        return jsonbackend.loads(f.read())
+
+def dumps(data):
+    """Object JSON text as DDR writes it (see jsonbackend)
+
+    @param data: list
+    @returns: str
+    """
+    return jsonbackend.dumps(data)
+
+def fields(data):
+    """Field name -> value
+
+    @param data: list
+    @returns: dict
+    """
+    values = {}
+    for item in data[1:]:
+        values.update(item)
+    return values
+
+def update(data, values, names=()):
+    """Set field values in place
+
+    Fields not yet in the file are inserted in `names` order, or at
+    the end.
+
+    @param data: list
+    @param values: dict Field name -> value
+    @param names: list Field names in FIELDS order
+    @returns: boolean True if anything changed
+    """
+    changed = False
+    missing = dict(values)
+    for item in data[1:]:
+        for name in item:
+            if name in missing:
+                value = missing.pop(name)
+                if item[name] != value:
+                    item[name] = value
+                    changed = True
+    if not missing:
+        return changed
+    position = {name: n for n,name in enumerate(names)}
+    for name,value in missing.items():
+        index = len(data)
+        if name in position:
+            for n,item in enumerate(data[1:], 1):
+                if any(position.get(key, -1) > position[name] for key in item):
+                    index = n
+                    break
+        data.insert(index, {name: value})
+    return True
+
+def write_many(items):
+    """Write several JSON files, renaming each into place
+
+    All files are written to temporary names first, then renamed, so
+    an error while writing leaves every original file untouched.
+
+    @param items: iterable of (path, data)
+    @returns: int Number of files written
+    """
+    written = []
+    try:
+        for path,data in items:
+            tmp = '%s.tmp%s' % (path, os.getpid())
+            with open(tmp, 'w') as f:
+                f.write(dumps(data))
+            written.append((tmp, path))
+    except:
+        for tmp,path in written:
+            os.remove(tmp)
+        raise
+    for tmp,path in written:
+        os.replace(tmp, path)
+    return len(written)
+
+
+# loading --------------------------------------------------------------
+
+def _hooks(model):
+    return importlib.import_module(modelgraph.module(model)).HOOKS
+
+def load(record, hooks=None):
+    """Fields of one object, converted by its module's jsonload_* hooks
+
+    @param record: walker.Record or other object with .model and .path
+    @param hooks: hooks.Hooks; default the model module's HOOKS
+    @returns: dict Field name -> value, in FIELDS order
+    """
+    if hooks is None:
+        hooks = _hooks(record.model)
+    return hooks.convert('jsonload', fields(read(record.path)))
+
+def load_many(records, workers=WORKERS, max_pending=MAX_PENDING,
+              ordered=True, on_error=None):
+    """Load objects on a thread pool, yielding them as they are ready
+
+    At most max_pending files are read or waiting to be yielded at any
+    time, so records may be a generator (e.g. walker.walk()) of any
+    length and the consumer can start before the last file is read.
+
+    @param records: iterable of walker.Record
+    @param workers: int Number of threads
+    @param max_pending: int Maximum number of reads in flight
+    @param ordered: boolean Yield in input order, or as completed
+    @param on_error: function(record, exception), or None to raise
+    @returns: generator of (record, fields dict)
+    """
+    tables = {}
+    # future -> record; dicts keep insertion (input) order
+    pending = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            for record in records:
+                if record.model not in tables:
+                    # import fields modules here, not in the workers
+                    tables[record.model] = _hooks(record.model)
+                pending[pool.submit(load, record, tables[record.model])] = record
+                if len(pending) >= max_pending:
+                    yield from _results(pending, ordered, on_error)
+            while pending:
+                yield from _results(pending, ordered, on_error)
+        finally:
+            for future in pending:
+                future.cancel()
+
+def _results(pending, ordered, on_error):
+    """Remove the next finished futures from pending; (record, fields)"""
+    if ordered:
+        finished = [next(iter(pending))]
+    else:
+        finished = wait(pending, return_when=FIRST_COMPLETED)[0]
+    results = []
+    for future in finished:
+        record = pending.pop(future)
+        try:
+            results.append((record, future.result()))
+        except Exception as err:
+            if on_error is None:
+                raise
+            on_error(record, err)
+    return results
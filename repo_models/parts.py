@@ -0,0 +1,130 @@
+"""Compact, immutable record of identifier parts
+
+IdParts holds the identifier components (repo, org, cid, eid, sid, role,
+sha1, in IDENTIFIERS order) in slots instead of a dict, which matters when
+millions of file identifiers are held in memory.  It reads like the parts
+dicts returned by resolver.resolve(): absent components are simply not
+keys.
+
+    >>> from repo_models.parts import IdParts
+    >>> p = IdParts.from_dict({'repo':'ddr', 'org':'densho', 'cid':'10'})
+    >>> p['cid'], p.cid, p.get('eid')
+    ('10', '10', None)
+    >>> dict(p)
+    {'repo': 'ddr', 'org': 'densho', 'cid': '10'}
+
+Other named groups from path patterns (basepath, id0, ext, ...) are kept
+separately and also appear as keys.
+
+IdParts.key() gives a canonical key for ordering and set membership
+that compares integer components (cid, eid, sid) numerically; see also
+resolver.sort_key().
+"""
+
+from collections.abc import Mapping
+
+from .identifier import IDENTIFIERS
+
+
+COMPONENTS = tuple(i['component']['name'] for i in IDENTIFIERS)
+COMPONENT_TYPES = tuple(i['component']['type'] for i in IDENTIFIERS)
+
+# Value used in sort keys for absent components, by component type.
+# Absent sorts first, so parents come before their children.
+_ABSENT = {int: -1, str: ''}
+
+
+class IdParts(Mapping):
+    """Identifier components in slots, with read-only dict-style access
+    """
+    __slots__ = COMPONENTS + ('_extra',)
+
+    def __init__(self, **kwargs):
+        extra = {}
+        for key,value in kwargs.items():
+            if key not in COMPONENTS:
+                extra[key] = value
+        for name in COMPONENTS:
+            object.__setattr__(self, name, kwargs.get(name))
+        object.__setattr__(self, '_extra', tuple(extra.items()) or None)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        @param data: dict e.g. from resolver.resolve()
+        @returns: IdParts
+        """
+        return cls(**data)
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def __setattr__(self, name, value):
+        raise AttributeError('IdParts is immutable')
+
+    def __delattr__(self, name):
+        raise AttributeError('IdParts is immutable')
+
+    def __getitem__(self, key):
+        if key in COMPONENTS:
+            value = getattr(self, key)
+            if value is not None:
+                return value
+        elif self._extra:
+            for k,value in self._extra:
+                if k == key:
+                    return value
+        raise KeyError(key)
+
+    def __iter__(self):
+        for name in COMPONENTS:
+            if getattr(self, name) is not None:
+                yield name
+        if self._extra:
+            for key,value in self._extra:
+                yield key
+
+    def __len__(self):
+        return len([name for name in self])
+
+    def values_tuple(self):
+        """Components in COMPONENTS order, None where absent"""
+        return tuple(getattr(self, name) for name in COMPONENTS)
+
+    def key(self):
+        """Sortable, hashable key: one int or str per component
+
+        Components declared int in IDENTIFIERS are compared as ints.
+        Absent components are -1 or '' so that an object sorts before
+        its children.
+
+        @returns: tuple
+        """
+        return tuple(
+            _ABSENT[t] if value is None else t(value)
+            for value,t in zip(self.values_tuple(), COMPONENT_TYPES)
+        )
+
+    def __hash__(self):
+        return hash((self.values_tuple(), self._extra))
+
+    def __eq__(self, other):
+        if isinstance(other, IdParts):
+            return (self.values_tuple() == other.values_tuple()) \
+                and (self._extra == other._extra)
+        return Mapping.__eq__(self, other)
+
+    def __reduce__(self):
+        return (_rebuild, (self.values_tuple(), self._extra))
+
+    def __repr__(self):
+        return '<IdParts %s>' % ' '.join(
+            '%s=%s' % (key, value) for key,value in self.items()
+        )
+
+
+def _rebuild(values, extra):
+    kwargs = dict(extra or ())
+    kwargs.update(zip(COMPONENTS, values))
+    return IdParts(**kwargs)
+
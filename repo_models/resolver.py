@@ -0,0 +1,763 @@
+"""Resolve IDs, paths and URLs to models using IDENTIFIERS patterns
+
+The naive approach tries every regex under every IDENTIFIERS entry's
+'patterns' until one matches.  This module analyzes the patterns once and
+buckets them by the shape of the strings they can match (number of dashes
+and slashes), so resolving a string only runs the few regexes that could
+possibly match it.
+
+IDs are first split on '-' and classified by segment count and shape
+(see parse_id); the regexes are only run when the generated tokenizer
+cannot decide, i.e. for strings it does not match.
+
+Patterns are tried most-specific model first (file, file-role, segment,
+entity, ...) and in declared order within a model, as DDR.identifier does.
+Bucketing never changes which pattern matches first, only how many
+patterns are skipped without being run.
+
+    >>> from repo_models import resolver
+    >>> resolver.resolve('ddr-densho-10-5', 'id')
+    ('entity', {'repo': 'ddr', 'org': 'densho', 'cid': '10', 'eid': '5'})
+    >>> resolver.resolve('/ddr/densho/10/5/master/a1b2c3d4e5', 'url')
+    ('file', {...})
+
+Nothing is compiled at import: buckets, parsers and regexes are built
+the first time they are needed.
+
+resolve_cached() memoizes results in a bounded LRU cache shared by all
+threads.  Cached parts are read-only IdParts records.
+
+    >>> resolver.resolve_cached('ddr-densho-10-5', 'id')
+    >>> resolver.CACHE.stats()
+    {'hits': 0, 'misses': 1, 'evictions': 0, 'size': 1, 'maxsize': 65536}
+"""
+
+from array import array
+from collections import OrderedDict
+import re
+import threading
+from .modelgraph import MODELS, MODELS_BY_LEVEL, MODEL_INDEX
+from .parts import COMPONENTS, IdParts
+
+
+KINDS = ['id', 'path', 'url']
+
+
+def _ordered_patterns(kind):
+    """List (model, pattern) for kind, most-specific model first.
+
+    @param kind: str 'id', 'path', or 'url'
+    @returns: list of (model, pattern) tuples
+    """
+    return [
+        (MODELS_BY_LEVEL[level]['model'], pattern)
+        for level in sorted(MODELS_BY_LEVEL, reverse=True)
+        for pattern in MODELS_BY_LEVEL[level]['patterns'][kind]
+    ]
+
+
+# pattern analysis -----------------------------------------------------
+#
+# Patterns are reduced to a list of top-level tokens:
+#   ('lit', char)    literal character
+#   ('dot', None)    unescaped '.', matches any character
+#   ('group', cls)   capturing group; cls is (dash, slash), whether the
+#                    group can consume '-' or '/'
+#   ('end', None)    trailing '$'
+#
+
+_ESCAPES_MATCHING_DASH_OR_SLASH = 'WSDB'
+
+def _class_can_match(body, char):
+    """Whether the character class body (without brackets) can match char.
+
+    Conservative: anything not understood is assumed to match.
+    """
+    if body.startswith('^'):
+        return True
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c == '\\':
+            esc = body[i+1:i+2]
+            if esc in ('w', 'd', 's'):
+                i += 2
+                continue
+            if esc in _ESCAPES_MATCHING_DASH_OR_SLASH:
+                return True
+            c = esc
+            i += 1
+        if (i + 2 < len(body)) and (body[i+1] == '-'):
+            lo = c
+            hi = body[i+2]
+            if hi == '\\':
+                return True
+            if lo <= char <= hi:
+                return True
+            i += 3
+            continue
+        if c == char:
+            return True
+        i += 1
+    return False
+
+def _group_can_match(body, char):
+    """Whether the body of a group can consume the given character."""
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c == '\\':
+            esc = body[i+1:i+2]
+            if esc in _ESCAPES_MATCHING_DASH_OR_SLASH or esc == char:
+                return True
+            i += 2
+        elif c == '[':
+            end = body.index(']', i + 2)
+            if _class_can_match(body[i+1:end], char):
+                return True
+            i = end + 1
+        elif c == '.':
+            return True
+        elif c == char:
+            return True
+        else:
+            i += 1
+    return False
+
+def _tokenize(pattern):
+    """Reduce a pattern to a list of top-level tokens (see above).
+
+    @param pattern: str
+    @returns: list of (type, value) tuples
+    """
+    tokens = []
+    i = 0
+    if pattern.startswith('^'):
+        i = 1
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\':
+            tokens.append(('lit', pattern[i+1]))
+            i += 2
+        elif c == '(':
+            depth = 0
+            j = i
+            while True:
+                if pattern[j] == '\\':
+                    j += 2
+                    continue
+                if pattern[j] == '[':
+                    j = pattern.index(']', j + 2) + 1
+                    continue
+                if pattern[j] == '(':
+                    depth += 1
+                elif pattern[j] == ')':
+                    depth -= 1
+                    if not depth:
+                        break
+                j += 1
+            body = pattern[i+1:j]
+            tokens.append(
+                ('group', (_group_can_match(body, '-'), _group_can_match(body, '/')))
+            )
+            i = j + 1
+        elif c == '.':
+            tokens.append(('dot', None))
+            i += 1
+        elif (c == '$') and (i == len(pattern) - 1):
+            tokens.append(('end', None))
+            i += 1
+        else:
+            tokens.append(('lit', c))
+            i += 1
+    return tokens
+
+def _counts(tokens):
+    """Possible (dashes, slashes) counts of strings matching tokens.
+
+    @param tokens: list of tokens, none of which are groups that can
+        consume '-' or '/'
+    @returns: set of (int, int)
+    """
+    dashes = len([t for t in tokens if t == ('lit', '-')])
+    slashes = len([t for t in tokens if t == ('lit', '/')])
+    dots = len([t for t in tokens if t[0] == 'dot'])
+    return set(
+        (dashes + d, slashes + s)
+        for d in range(dots + 1)
+        for s in range(dots + 1 - d)
+    )
+
+def _keys_whole(tokens):
+    """Shape keys for a pattern matched against the whole string.
+
+    @returns: set of (dashes, slashes) or None if the pattern can match
+        strings of any shape
+    """
+    if tokens[-1] != ('end', None):
+        return None
+    for t,cls in tokens:
+        if (t == 'group') and (cls[0] or cls[1]):
+            return None
+    return _counts(tokens)
+
+def _keys_tail(tokens):
+    """Shape keys for a pattern matched against the last path segment.
+
+    The last segment is whatever follows the last '/' in the string.
+    That '/' is either the pattern's last literal '/' or a '.' after it.
+
+    @returns: set of dash counts or None if the pattern can match
+        strings of any shape
+    """
+    if tokens[-1] != ('end', None):
+        return None
+    last_slash = -1
+    for n,token in enumerate(tokens):
+        if token == ('lit', '/'):
+            last_slash = n
+    tail = tokens[last_slash+1:]
+    for t,cls in tail:
+        if (t == 'group') and (cls[0] or cls[1]):
+            return None
+    keys = set()
+    cuts = [-1] + [n for n,token in enumerate(tail) if token[0] == 'dot']
+    for cut in cuts:
+        for dashes,slashes in _counts(tail[cut+1:]):
+            if not slashes:
+                keys.add(dashes)
+    return keys
+
+
+# shape keys for strings -----------------------------------------------
+
+def _key_whole(text):
+    return (text.count('-'), text.count('/'))
+
+def _key_tail(text):
+    return text[text.rfind('/')+1:].count('-')
+
+
+class _LazyRegex(object):
+    """Pattern that is compiled the first time it is used
+
+    Most strings are resolved without running a regex at all (see
+    parse_id), so compiling every pattern at import is wasted work.
+    """
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+
+    def compiled(self):
+        regex = re.compile(self.pattern)
+        # instance attributes hide the methods below from now on
+        self.match = regex.match
+        self.groupindex = regex.groupindex
+        return regex
+
+    def match(self, text):
+        return self.compiled().match(text)
+
+    def __getattr__(self, name):
+        if name == 'groupindex':
+            return self.compiled().groupindex
+        raise AttributeError(name)
+
+
+def _analyze(kind):
+    """Tokens and shape keys for each pattern of kind, in match order
+
+    @param kind: str 'id', 'path', or 'url'
+    @returns: (patterns, whole, keysets): list of (model, pattern,
+        tokens); True if keys are _key_whole() shapes, False if
+        _key_tail(); list of key sets, None for wildcard patterns.
+    """
+    patterns = [
+        (model, pattern, _tokenize(pattern))
+        for model,pattern in _ordered_patterns(kind)
+    ]
+    # Use whole-string shapes when every pattern allows it; otherwise
+    # fall back to the shape of the last path segment.
+    keysets = [_keys_whole(tokens) for model,pattern,tokens in patterns]
+    if None not in keysets:
+        return patterns,True,keysets
+    return patterns,False,[_keys_tail(tokens) for model,pattern,tokens in patterns]
+
+
+class _Dispatcher(object):
+    """Shape-bucketed list of patterns for one kind
+
+    The buckets are built on first use.
+    """
+    _LAZY = ['patterns', 'keyfunc', 'buckets', 'default']
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def __getattr__(self, name):
+        if name in self._LAZY:
+            self._build()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def _build(self):
+        patterns,whole,keysets = _analyze(self.kind)
+        self.patterns = [
+            (model, _LazyRegex(pattern), tokens)
+            for model,pattern,tokens in patterns
+        ]
+        if whole:
+            self.keyfunc = _key_whole
+        else:
+            self.keyfunc = _key_tail
+        allkeys = set()
+        for keys in keysets:
+            if keys:
+                allkeys.update(keys)
+        self.buckets = {
+            key: tuple(
+                (model, regex)
+                for (model,regex,tokens),keys in zip(self.patterns, keysets)
+                if (keys is None) or (key in keys)
+            )
+            for key in allkeys
+        }
+        # strings whose shape no anchored pattern has
+        self.default = tuple(
+            (model, regex)
+            for (model,regex,tokens),keys in zip(self.patterns, keysets)
+            if keys is None
+        )
+
+    def resolve(self, text):
+        for model,regex in self.buckets.get(self.keyfunc(text), self.default):
+            m = regex.match(text)
+            if m:
+                return model,m.groupdict()
+        return None
+
+
+DISPATCHERS = {kind: _Dispatcher(kind) for kind in KINDS}
+
+
+# regex-free tokenizer -------------------------------------------------
+#
+# Patterns like '^(?P<repo>[\w]+)-(?P<org>[\w]+)-(?P<cid>[\d]+)$' are
+# a fixed sequence of groups joined by a separator.  Splitting the string
+# on the separator once and checking each segment with str methods gives
+# the same answer as the regex.
+
+_SEGMENT = re.compile(r'^\(\?P<(\w+)>\[([^\]]+)\]\+\)$')
+
+# Character classes the tokenizer understands, with the test a segment
+# ('%(s)s') must pass to match '[class]+'.  str.isalnum() is what re uses
+# for \w (plus '_'), and str.isdecimal() is re's \d, for any input.
+SEGMENT_TESTS = {
+    r'\w': "(%(s)s.isalnum() or %(s)s.replace('_', 'a').isalnum())",
+    r'\w\d': "(%(s)s.isalnum() or %(s)s.replace('_', 'a').isalnum())",
+    r'\d': '%(s)s.isdecimal()',
+    r'a-zA-Z': '%(s)s.isalpha() and %(s)s.isascii()',
+}
+
+def _segments(pattern, prefix, sep):
+    """Break pattern into (name, class) per separator-joined group.
+
+    @param pattern: str
+    @param prefix: str Literal text before the first group
+    @param sep: str Literal separator between groups
+    @returns: list of (name, class) or None if pattern is not that shape
+    """
+    if pattern.startswith('^'):
+        pattern = pattern[1:]
+    if not (pattern.startswith(prefix) and pattern.endswith('$')):
+        return None
+    joiner = ')%s(' % sep
+    segments = []
+    for item in pattern[len(prefix):-1].split(joiner):
+        m = _SEGMENT.match('(%s)' % item.lstrip('(').rstrip(')'))
+        if not (m and (m.group(2) in SEGMENT_TESTS)):
+            return None
+        segments.append((m.group(1), m.group(2)))
+    return segments
+
+def _segment_branches(candidates, indent, matched):
+    """Lines that test the segments in 's' against candidates.
+
+    The lines branch on the number of segments ('n') and test each
+    segment of that count's candidates in order.
+
+    @param candidates: dict of segment count: list of (model, segments)
+        in match order
+    @param indent: str Indentation of the branches
+    @param matched: function(model, segments, names) -> list of lines
+        to run on a match; they must leave the branch
+    @returns: list of str
+    """
+    lines = []
+    branch = 'if'
+    for count in sorted(candidates):
+        names = ['s%s' % n for n in range(count)]
+        lines.append('%s%s n == %s:' % (indent, branch, count))
+        lines.append('%s    [%s] = s' % (indent, ', '.join(names)))
+        for model,segments in candidates[count]:
+            tests = [
+                SEGMENT_TESTS[cls] % {'s': names[n]}
+                for n,(name,cls) in enumerate(segments)
+            ]
+            lines.append('%s    if %s:' % (indent, ' and '.join(tests)))
+            lines.extend(
+                '%s        %s' % (indent, line)
+                for line in matched(model, segments, names)
+            )
+        branch = 'elif'
+    return lines
+
+def _segment_parser_source(candidates, prefix, sep):
+    """Source of a function that picks the first matching candidate.
+
+    The function splits its argument once and runs _segment_branches().
+    It returns False when no candidate matches, since a regex may still
+    match a string with a trailing newline.
+
+    @param candidates: dict of segment count: list of (model, segments)
+        in match order
+    @param prefix: str
+    @param sep: str
+    @returns: str defining function parse(text) -> (model, parts),
+        or False if undecided
+    """
+    def matched(model, segments, names):
+        parts = ', '.join(
+            '%r: %s' % (name, names[n])
+            for n,(name,cls) in enumerate(segments)
+        )
+        return ['return %r, {%s}' % (model, parts)]
+    lines = ['def parse(text):']
+    if prefix:
+        lines.append('    if not text.startswith(%r):' % prefix)
+        lines.append('        return False')
+        lines.append('    s = text[%s:].split(%r)' % (len(prefix), sep))
+    else:
+        lines.append('    s = text.split(%r)' % sep)
+    lines.append('    n = len(s)')
+    lines.extend(_segment_branches(candidates, '    ', matched))
+    lines.append('    return False')
+    return '\n'.join(lines)
+
+def _columns_parser_source(candidates, prefix, sep):
+    """Source of a function that parses a list of strings into columns.
+
+    Like _segment_parser_source() but in a single loop over the strings,
+    writing each match straight into preallocated columns instead of
+    building a parts dict.
+
+    @param candidates: dict of segment count: list of (model, segments)
+        in match order
+    @param prefix: str
+    @param sep: str
+    @returns: str defining function parse_columns(texts, codes, columns)
+        -> list of indexes of the texts left undecided
+    """
+    def matched(model, segments, names):
+        lines = ['codes[i] = %s' % MODEL_INDEX[model]]
+        lines.extend(
+            'col_%s[i] = %s' % (name, names[n])
+            for n,(name,cls) in enumerate(segments)
+        )
+        lines.append('continue')
+        return lines
+    lines = ['def parse_columns(texts, codes, columns):']
+    lines.extend(
+        '    col_%s = columns[%r]' % (name, name) for name in COMPONENTS
+    )
+    lines.append('    rest = []')
+    lines.append('    for i,text in enumerate(texts):')
+    if prefix:
+        lines.append('        if not text.startswith(%r):' % prefix)
+        lines.append('            rest.append(i)')
+        lines.append('            continue')
+        lines.append('        s = text[%s:].split(%r)' % (len(prefix), sep))
+    else:
+        lines.append('        s = text.split(%r)' % sep)
+    lines.append('        n = len(s)')
+    lines.extend(_segment_branches(candidates, '        ', matched))
+    lines.append('        rest.append(i)')
+    lines.append('    return rest')
+    return '\n'.join(lines)
+
+def _compile_segment_parser(source, name='parse'):
+    """
+    @param source: str from _segment_parser_source() or
+        _columns_parser_source()
+    @param name: str Name of the function source defines
+    @returns: function
+    """
+    namespace = {}
+    exec(compile(source, '<segment parser>', 'exec'), namespace)
+    return namespace[name]
+
+def _analyze_segments(patterns, prefix, sep):
+    """Segment candidates for a _SegmentTable
+
+    @returns: (unsupported, candidates by segment count)
+    """
+    unsupported = []
+    candidates = {}
+    for model,pattern in patterns:
+        segments = _segments(pattern, prefix, sep)
+        if segments is not None:
+            candidates.setdefault(len(segments), []).append((model, segments))
+        elif pattern.lstrip('^').startswith(prefix):
+            unsupported.append(pattern)
+    return unsupported,candidates
+
+
+class _SegmentTable(object):
+    """Tokenizer for patterns made of separator-joined groups
+
+    Candidates are grouped by segment count and kept in pattern order,
+    and parse(text) is generated from them on first use.  It returns
+    (model, parts), or False if the regexes have to decide.  If any
+    pattern with the prefix is not of that shape, parse() always returns
+    False.  parse_columns() (see _columns_parser_source) is generated the
+    first time it is used.
+    """
+
+    _LAZY = ['unsupported', 'candidates', 'parse']
+
+    def __init__(self, patterns, prefix, sep):
+        """
+        @param patterns: list of (model, pattern) in match order
+        @param prefix: str
+        @param sep: str
+        """
+        self.patterns = tuple(patterns)
+        self.prefix = prefix
+        self.sep = sep
+
+    def __getattr__(self, name):
+        if name in self._LAZY:
+            self._build()
+            return getattr(self, name)
+        if name == 'parse_columns':
+            self.parse_columns = _compile_segment_parser(
+                _columns_parser_source(
+                    self._supported(), self.prefix, self.sep
+                ),
+                'parse_columns'
+            )
+            return self.parse_columns
+        raise AttributeError(name)
+
+    def _supported(self):
+        """Candidates to generate parsers from, none if any are unsupported"""
+        if self.unsupported:
+            return {}
+        return self.candidates
+
+    def _build(self):
+        self.unsupported,self.candidates = _analyze_segments(
+            self.patterns, self.prefix, self.sep
+        )
+        self.parse = _compile_segment_parser(
+            _segment_parser_source(self._supported(), self.prefix, self.sep)
+        )
+
+
+ID_TOKENIZER = _SegmentTable(_ordered_patterns('id'), '', '-')
+
+
+def parse_id(text):
+    """Identify an ID by splitting on dashes, without regexes where possible
+
+    Returns the same as resolve(text, 'id').
+
+    @param text: str
+    @returns: (model, parts) tuple or None if text matches no pattern
+    """
+    result = ID_TOKENIZER.parse(text)
+    if result is False:
+        return DISPATCHERS['id'].resolve(text)
+    return result
+
+
+def resolve(text, kind):
+    """Identify the model of an ID, path, or URL and return its parts
+
+    @param text: str
+    @param kind: str 'id', 'path', or 'url'
+    @returns: (model, parts) tuple or None if text matches no pattern
+    """
+    if kind == 'id':
+        return parse_id(text)
+    return DISPATCHERS[kind].resolve(text)
+
+def resolve_naive(text, kind):
+    """Reference implementation: try every pattern in turn
+
+    Same results as resolve(); used for testing and benchmarking.
+
+    @param text: str
+    @param kind: str 'id', 'path', or 'url'
+    @returns: (model, parts) tuple or None if text matches no pattern
+    """
+    for model,regex,tokens in DISPATCHERS[kind].patterns:
+        m = regex.match(text)
+        if m:
+            return model,m.groupdict()
+    return None
+
+def resolve_many(texts, kind):
+    """Resolve many IDs, paths, or URLs, returning columns
+
+    Results are columnar: a model code per input (index into MODELS, -1
+    if nothing matched) and one list per identifier component ('' where
+    the component is absent), the same as resolve() gives for each.
+
+    IDs are parsed by the ID tokenizer's parse_columns(), which writes
+    each match straight into the columns.  Paths, URLs and any IDs it
+    leaves undecided are resolved one at a time.
+
+    >>> r = resolve_many(['ddr-densho-10', 'ddr-densho-10-5'], 'id')
+    >>> [MODELS[code] for code in r['model']]
+    ['collection', 'entity']
+    >>> r['cid'], r['eid']
+    (['10', '10'], ['', '5'])
+
+    @param texts: iterable of str
+    @param kind: str 'id', 'path', or 'url'
+    @returns: dict with 'model' (array of int) and a list per component
+    """
+    texts = list(texts)
+    codes = array('b', [-1]) * len(texts)
+    columns = {name: [''] * len(texts) for name in COMPONENTS}
+    if kind == 'id':
+        rest = ID_TOKENIZER.parse_columns(texts, codes, columns)
+    else:
+        rest = range(len(texts))
+    dispatcher = DISPATCHERS[kind]
+    for i in rest:
+        result = dispatcher.resolve(texts[i])
+        if result:
+            model,parts = result
+            codes[i] = MODEL_INDEX[model]
+            for name in COMPONENTS:
+                if parts.get(name):
+                    columns[name][i] = parts[name]
+    columns['model'] = codes
+    return columns
+
+
+# cache ----------------------------------------------------------------
+
+class ResolverCache(object):
+    """Bounded, thread-safe LRU cache of resolve() results
+    
+    Keys are (kind, text).  Values are (model, IdParts) tuples, or None
+    for strings that match nothing.
+    """
+
+    def __init__(self, maxsize=65536):
+        """
+        @param maxsize: int Maximum number of entries
+        """
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, text, kind):
+        """Resolve text, using the cached result if there is one
+
+        @param text: str
+        @param kind: str 'id', 'path', or 'url'
+        @returns: (model, parts) tuple or None
+        """
+        key = (kind, text)
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                pass
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+        result = resolve(text, kind)
+        if result:
+            result = (result[0], IdParts.from_dict(result[1]))
+        with self._lock:
+            self.misses += 1
+            self._data[key] = result
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        """Empty the cache and reset the counters"""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def resize(self, maxsize):
+        """Change the maximum size, evicting entries if necessary
+
+        @param maxsize: int
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        """
+        @returns: dict of hits, misses, evictions, size, maxsize
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+            }
+
+
+CACHE = ResolverCache()
+
+
+def resolve_cached(text, kind):
+    """Same as resolve() but memoized in CACHE; parts are IdParts
+
+    @param text: str
+    @param kind: str 'id', 'path', or 'url'
+    @returns: (model, parts) tuple or None if text matches no pattern
+    """
+    return CACHE.get(text, kind)
+
+
+def sort_key(text, kind='id'):
+    """Sortable key for an ID, path, or URL (see IdParts.key)
+
+    Integer components compare numerically, so 'ddr-densho-9' sorts
+    before 'ddr-densho-10'.  Parsing goes through resolve_cached(), so
+    repeated sorts of the same listings do not re-parse.  Strings that
+    match no pattern sort last, by text.
+
+    >>> sorted(['ddr-densho-10', 'ddr-densho-9'], key=sort_key)
+    ['ddr-densho-9', 'ddr-densho-10']
+
+    @param text: str
+    @param kind: str 'id', 'path', or 'url'
+    @returns: tuple
+    """
+    result = resolve_cached(text, kind)
+    if result:
+        return (0, result[1].key())
+    return (1, text)
@@ -0,0 +1,59 @@
+"""Map request URLs to objects using the IDENTIFIERS 'url' patterns
+
+Editor URLs are '/ui/' followed by an object ID, public URLs are the ID's
+components separated by slashes:
+
+    /ui/ddr-densho-10-5-master-a1b2c3d4e5
+    /ddr/densho/10/5/master/a1b2c3d4e5
+
+route() picks the editor or public table by prefix and calls the
+parser generated for it (see resolver._SegmentTable), which splits the
+rest on '-' or '/' and tests the segments of that count's patterns.  The
+cost of a request is proportional to the number of segments rather than
+the number of patterns.  It falls back to the regexes only for URLs the
+parsers do not match.
+
+    >>> from repo_models import router
+    >>> router.route('/ddr/densho/10/5')
+    ('entity', {'repo': 'ddr', 'org': 'densho', 'cid': '10', 'eid': '5'})
+    >>> router.route('/ui/ddr-densho-10-5')
+    ('entity', {'repo': 'ddr', 'org': 'densho', 'cid': '10', 'eid': '5'})
+
+Results are the same as resolver.resolve(url, 'url').  A one-segment
+editor URL such as '/ui/ddr' is a public organization URL (repository
+'ui', organization 'ddr'), as in IDENTIFIERS pattern order.
+"""
+
+from .resolver import DISPATCHERS, _SegmentTable, _ordered_patterns
+
+
+EDITOR_PREFIX = '/ui/'
+PUBLIC_PREFIX = '/'
+
+
+def _is_editor(pattern):
+    return pattern.lstrip('^').startswith(EDITOR_PREFIX)
+
+EDITOR = _SegmentTable(
+    [(model,p) for model,p in _ordered_patterns('url') if _is_editor(p)],
+    EDITOR_PREFIX, '-'
+)
+PUBLIC = _SegmentTable(
+    [(model,p) for model,p in _ordered_patterns('url') if not _is_editor(p)],
+    PUBLIC_PREFIX, '/'
+)
+
+
+def route(url):
+    """Identify the object a URL path points to
+
+    @param url: str Path part of the URL, without query string
+    @returns: (model, parts) tuple or None if no pattern matches
+    """
+    if url.startswith(EDITOR_PREFIX) and ('-' in url):
+        result = EDITOR.parse(url)
+    else:
+        result = PUBLIC.parse(url)
+    if result is False:
+        return DISPATCHERS['url'].resolve(url)
+    return result
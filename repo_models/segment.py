@@ -7,6 +7,9 @@ import re
 from DDR import converters
 from DDR import vocab
 from . import common
+from . import display
+from .fieldsets import FieldSet
+from .hooks import Hooks
 
 
 MODEL = 'segment'
@@ -1065,6 +1068,9 @@ FIELDS_CSV_EXCLUDED = [
     'files',
 ]
 
+# Precomputed views of FIELDS; see fieldsets.FieldSet.
+FIELDSET = FieldSet(MODEL, FIELDS, FIELDS_CSV_EXCLUDED, REQUIRED_FIELDS_EXCEPTIONS)
+
 
 
 # jsonload_* --- load-from-json functions ----------------------------
@@ -1114,22 +1120,13 @@ def display_record_lastmod(data):
     )
 
 def display_status( data ):
-    for c in common.STATUS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(common.STATUS_LABELS, data)
 
 def display_public( data ):
-    for c in common.PERMISSIONS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(common.PERMISSIONS_LABELS, data)
 
 def display_rights( data ):
-    for c in common.RIGHTS_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(common.RIGHTS_LABELS, data)
 
 # collection
 # title
@@ -1156,16 +1153,10 @@ def display_language( data ):
     return ''
 
 def display_genre( data ):
-    for c in common.GENRE_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(common.GENRE_LABELS, data)
 
 def display_format( data ):
-    for c in common.FORMAT_CHOICES:
-        if data == c[0]:
-            return c[1]
-    return data
+    return common.choice_label(common.FORMAT_LABELS, data)
 
 # dimensions
 # organization
@@ -1200,13 +1191,7 @@ def display_geography( data ):
 # The following are utility functions used by functions.
 
 def _display_multiline_dict( template, data ):
-    t = []
-    for d in data:
-        if type(d) == type({}):
-            t.append(converters.render(template, d))
-        else:
-            t.append(d)
-    return '\n'.join(t)
+    return display.render_list(template, data)
 
 
 # index_* --- format for Elasticsearch functions -----------------------
@@ -1457,3 +1442,13 @@ def csvdump_persons(data): return converters.list_to_text(data)
 def csvdump_facility(data): return converters.listofdicts_to_text(data)
 def csvdump_chronology(data): return converters.listofdicts_to_text(data)
 def csvdump_geography(data): return converters.listofdicts_to_text(data)
+
+
+
+# hook tables ---------------------------------------------------------
+#
+# Functions above by family and field name; see hooks.Hooks.
+# Keep this at the end of the module, after all hook functions.
+#
+
+HOOKS = Hooks(globals(), FIELDSET.names)
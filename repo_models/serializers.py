@@ -0,0 +1,123 @@
+"""Turn loaded objects into Elasticsearch documents without dsl.Document
+
+The indexing loop sketched at the top of elastic.py instantiates the
+model's elasticsearch_dsl Document, sets each doctype field (through the
+module's index_* hook if there is one), fills in identifier parts,
+parent_id and collection_id, and calls to_dict().  This module generates
+one function per model that builds the same dict directly:
+
+    >>> from repo_models import serializers
+    >>> serialize = serializers.serializer('entity')
+    >>> serialize(entity_object, entity_object.identifier.parts)
+    {'id': 'ddr-densho-10-5', 'record_created': ..., 'repo': 'ddr', ...}
+
+The result is the _source of a bulk API action, equal to what
+Document.to_dict() returns for the same fields (bench_serializer checks
+this): fields whose values are empty are left out, other values are
+passed through as the index_* hooks return them, and absent identifier
+parts are ''.  lineage is built from the identifier parts by
+lineage.lineage() rather than read from the object.
+"""
+
+from .hooks import identity
+from .lineage import collection_id, lineage, parent_id
+from .parts import COMPONENTS
+
+
+# Set from the identifier rather than read from the object
+FROM_IDENTIFIER = list(COMPONENTS) + ['parent_id', 'collection_id', 'lineage']
+
+
+def _lineage(parts):
+    """ESLineage dicts for the object and its ancestors"""
+    return [a._asdict() for a in lineage(parts)]
+
+
+def doctype_properties(esclass):
+    """Field name -> mapping properties for an elasticsearch_dsl Document class
+
+    @param esclass: elasticsearch_dsl.Document subclass
+    @returns: dict
+    """
+    mapping = esclass._doc_type.mapping.to_dict()
+    if 'properties' not in mapping:
+        # older elasticsearch_dsl: {doctype: {'properties': ...}}
+        mapping = list(mapping.values())[0]
+    return mapping['properties']
+
+def model_properties(model):
+    """Mapping properties of a model's Elasticsearch document class
+
+    @param model: str 'collection', 'entity', 'segment', or 'file'
+    @returns: dict
+    """
+    from . import elastic
+    esclass = {
+        c['doctype']: c['class'] for c in elastic.ELASTICSEARCH_CLASSES['all']
+    }[model]
+    return doctype_properties(esclass)
+
+def compile_serializer(properties, hooks):
+    """Generate a serializer from mapping properties and index_* hooks
+
+    @param properties: dict Field name -> mapping properties, in order
+    @param hooks: dict Field name -> index_* function (hooks.Hooks['index'])
+    @returns: function(document, parts) -> dict
+    """
+    namespace = {
+        'parent_id': parent_id, 'collection_id': collection_id,
+        'lineage': _lineage,
+    }
+    lines = ['def serialize(o, parts):', '    d = {}']
+    for n,(name,props) in enumerate(properties.items()):
+        if name in FROM_IDENTIFIER:
+            continue
+        hook = hooks.get(name, identity)
+        if hook is identity:
+            lines.append('    v = getattr(o, %r, None)' % name)
+        else:
+            namespace['h%s' % n] = hook
+            lines.append('    v = h%s(o.%s)' % (n, name))
+        lines.append('    if v:')
+        lines.append('        d[%r] = v' % name)
+    lines.append('    get = parts.get')
+    for name in COMPONENTS:
+        if name in properties:
+            lines.append('    v = get(%r, "")' % name)
+            lines.append('    if v is not None:')
+            lines.append('        d[%r] = v' % name)
+    for name in ['parent_id', 'collection_id', 'lineage']:
+        if name in properties:
+            lines.append('    v = %s(parts)' % name)
+            lines.append('    if v:')
+            lines.append('        d[%r] = v' % name)
+    lines.append('    return d')
+    exec('\n'.join(lines), namespace)
+    return namespace['serialize']
+
+
+SERIALIZERS = {}
+
+def serializer(model):
+    """Serializer for a model, generated on first use
+
+    @param model: str 'collection', 'entity', 'segment', or 'file'
+    @returns: function(document, parts) -> dict
+    """
+    try:
+        return SERIALIZERS[model]
+    except KeyError:
+        pass
+    from . import elastic
+    hooks = elastic.fields_module(model).HOOKS['index']
+    SERIALIZERS[model] = compile_serializer(model_properties(model), hooks)
+    return SERIALIZERS[model]
+
+def serialize(document, parts):
+    """Elasticsearch document (bulk _source) for a loaded object
+
+    @param document: object with a .identifier.model, e.g. DDR.models.Entity
+    @param parts: dict or IdParts Identifier components
+    @returns: dict
+    """
+    return serializer(document.identifier.model)(document, parts)
@@ -0,0 +1,319 @@
+"""Enumerate the objects in a collection directory
+
+The on-disk layout follows the IDENTIFIERS path templates: a collection
+directory holds its JSON file (files['json']) and a files/ directory
+(files['files']); each object with a files/ directory of its own
+(entity, segment) is a subdirectory named by its ID, and each file is
+an {id}.json next to its binaries.
+
+Rather than os.walk() every directory and match path regexes against
+every entry, walk() scans only the directories the layout allows,
+identifies each entry by its name alone (resolver.parse_id), and prunes
+anything that is not a child of the directory's object.  Binaries,
+access files, .git and .git/annex are never descended into.
+
+    >>> from repo_models import walker
+    >>> for r in walker.walk('/var/www/media/ddr/ddr-densho-10'):
+    ...     print(r.model, r.id, r.path)
+    collection ddr-densho-10 /var/www/media/ddr/ddr-densho-10/collection.json
+    entity ddr-densho-10-1 /var/www/media/ddr/ddr-densho-10/files/ddr-densho-10-1/entity.json
+    ...
+"""
+
+from collections import namedtuple
+import os
+
+from .modelgraph import CHILDREN, MODELS_BY_NAME
+from .parts import IdParts
+from .resolver import parse_id
+
+
+Record = namedtuple('Record', ['model', 'id', 'parts', 'path'])
+
+
+def _json_suffix(model):
+    """Suffix of a model's '{id}.json' file name, e.g. '.json'"""
+    template = MODELS_BY_NAME[model]['files'].get('json', '')
+    if template.startswith('{id}'):
+        return template[len('{id}'):]
+    return None
+
+# Models whose objects are directories (they have a files/ directory)
+# and models whose objects are {id}.json files.
+DIRECTORY_MODELS = [
+    model for model,i in MODELS_BY_NAME.items()
+    if i['files'].get('files')
+]
+JSONFILE_MODELS = {
+    model: _json_suffix(model)
+    for model in MODELS_BY_NAME
+    if _json_suffix(model)
+}
+
+# Entries never descended into, as declared under the collection's files
+SKIP = set([
+    MODELS_BY_NAME['collection']['files'][key]
+    for key in ['git', 'annex']
+])
+
+
+def _identify(name):
+    """(model, IdParts) for a directory or file name, or None"""
+    result = parse_id(name)
+    if not result:
+        return None
+    model,parts = result
+    if not isinstance(parts, IdParts):
+        parts = IdParts.from_dict(parts)
+    return model,parts
+
+def _children(path, oid, model):
+    """Scan the files/ directory of object oid at path
+
+    @returns: list of (model, id, parts, entry path, is_dir) tuples
+    """
+    files_dir = os.path.join(path, MODELS_BY_NAME[model]['files']['files'])
+    allowed = CHILDREN[model]
+    prefix = oid + '-'
+    found = []
+    try:
+        entries = os.scandir(files_dir)
+    except FileNotFoundError:
+        return found
+    with entries:
+        for entry in entries:
+            name = entry.name
+            # cheap prefix test prunes anything not belonging to oid
+            if (not name.startswith(prefix)) or (name in SKIP):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                result = _identify(name)
+                if result and (result[0] in allowed) \
+                and (result[0] in DIRECTORY_MODELS):
+                    found.append((result[0], name, result[1], entry.path, True))
+            else:
+                for child,suffix in JSONFILE_MODELS.items():
+                    if (child in allowed) and name.endswith(suffix):
+                        cid = name[:-len(suffix)]
+                        result = _identify(cid)
+                        if result and (result[0] == child):
+                            found.append((child, cid, result[1], entry.path, False))
+                        break
+    return found
+
+def _unit(path):
+    path = os.path.normpath(path)
+    oid = os.path.basename(path)
+    result = _identify(oid)
+    if not result or (result[0] not in DIRECTORY_MODELS):
+        raise Exception('Not a collection, entity or segment directory: %s' % path)
+    return (path, oid, result[0], result[1])
+
+def _walk(path, oid, model, parts):
+    yield Record(
+        model, oid, parts,
+        os.path.join(path, MODELS_BY_NAME[model]['files']['json'])
+    )
+    for child,cid,cparts,cpath,is_dir in _children(path, oid, model):
+        if is_dir:
+            yield from _walk(cpath, cid, child, cparts)
+        else:
+            yield Record(child, cid, cparts, cpath)
+
+def walk(path):
+    """Yield a Record for every object in a collection (or entity) directory
+
+    Objects are yielded before their children, in directory scan order.
+    The record path is the object's JSON file.
+
+    @param path: str Absolute path to a collection or entity directory.
+        The last path component must be the object's ID.
+    @returns: generator of Record(model, id, parts, path)
+    """
+    yield from _walk(*_unit(path))
+
+def walk_naive(path):
+    """Reference implementation: os.walk and path regexes
+
+    Same records as walk(), possibly in a different order; used for
+    testing and benchmarking.
+    """
+    from .resolver import resolve
+    path = os.path.normpath(path)
+    for dirpath,dirnames,filenames in os.walk(path):
+        dirnames[:] = [d for d in dirnames if d not in SKIP]
+        for name in filenames:
+            fpath = os.path.join(dirpath, name)
+            result = resolve(fpath, 'path')
+            if not result:
+                continue
+            model,parts = result
+            if model in DIRECTORY_MODELS:
+                oid = os.path.basename(dirpath)
+                if name != MODELS_BY_NAME[model]['files']['json']:
+                    continue
+            elif name.endswith(JSONFILE_MODELS.get(model, '\0')):
+                oid = name[:-len(JSONFILE_MODELS[model])]
+            else:
+                continue
+            yield Record(model, oid, _identify(oid)[1], fpath)
+
+
+# parallel walker ------------------------------------------------------
+#
+# Work is divided into tasks, each a list of units (directory path, id,
+# model, parts) to walk().  A collection is one task unless it has more
+# than split entities, in which case its own record is one task and its
+# entities are walked in tasks of chunksize entities each.  Workers put
+# batches of records on a bounded queue, so a slow consumer holds back
+# the workers rather than filling memory.
+#
+# With ordered=True each worker sorts a task's records by IdParts.key()
+# and the main process yields tasks in order.  Tasks are numbered in key
+# order and cover disjoint key ranges, so the output is sorted overall.
+
+_DONE = 'done'
+_ERROR = 'error'
+
+
+def _tasks(paths, split, chunksize):
+    """List tasks for paths in IdParts.key() order
+
+    @returns: list of (records, units) tuples; records are yielded
+        as-is, units are walked.
+    """
+    units = sorted([_unit(path) for path in paths], key=lambda u: u[3].key())
+    tasks = []
+    for unit in units:
+        path,oid,model,parts = unit
+        if not split:
+            tasks.append(([], [unit]))
+            continue
+        children = _children(path, oid, model)
+        if len(children) <= split:
+            tasks.append(([], [unit]))
+            continue
+        this = Record(
+            model, oid, parts,
+            os.path.join(path, MODELS_BY_NAME[model]['files']['json'])
+        )
+        tasks.append(([this], []))
+        children.sort(key=lambda c: c[2].key())
+        for n in range(0, len(children), chunksize):
+            records = []
+            units = []
+            for child,cid,cparts,cpath,is_dir in children[n:n+chunksize]:
+                if is_dir:
+                    units.append((cpath, cid, child, cparts))
+                else:
+                    records.append(Record(child, cid, cparts, cpath))
+            tasks.append((records, units))
+    return tasks
+
+def _worker(tasks, results, ordered, batchsize):
+    """Walk tasks from the tasks queue until None, putting batches on results
+
+    Puts (task number, batch) for each batch, (task number, _DONE) at
+    the end of each task, and (None, _DONE) or (None, (_ERROR, message))
+    when finished.
+    """
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            n,(records,units) = task
+            batch = list(records)
+            if ordered:
+                for path,oid,model,parts in units:
+                    batch.extend(_walk(path, oid, model, parts))
+                batch.sort(key=lambda r: r.parts.key())
+                for i in range(0, len(batch), batchsize):
+                    results.put((n, batch[i:i+batchsize]))
+            else:
+                for path,oid,model,parts in units:
+                    for record in _walk(path, oid, model, parts):
+                        batch.append(record)
+                        if len(batch) >= batchsize:
+                            results.put((n, batch))
+                            batch = []
+                if batch:
+                    results.put((n, batch))
+            results.put((n, _DONE))
+    except Exception:
+        import traceback
+        results.put((None, (_ERROR, traceback.format_exc())))
+        return
+    results.put((None, _DONE))
+
+def walk_parallel(paths, workers=None, ordered=False, split=1000,
+                  chunksize=100, batchsize=500, queue_size=64):
+    """Yield Records for many collection directories using worker processes
+
+    @param paths: list of collection (or entity) directory paths
+    @param workers: int Number of worker processes (default: CPU count)
+    @param ordered: boolean Yield records sorted by IdParts.key();
+        otherwise in whatever order workers produce them.
+    @param split: int Walk collections with more entities than this in
+        several tasks (0 to never split).
+    @param chunksize: int Number of entities per task when splitting.
+    @param batchsize: int Number of records sent from a worker at once.
+    @param queue_size: int Maximum number of batches waiting in the queue.
+    @returns: generator of Record(model, id, parts, path)
+    """
+    import multiprocessing
+    tasks = _tasks(paths, split, chunksize)
+    if not tasks:
+        return
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    task_queue = multiprocessing.Queue()
+    results = multiprocessing.Queue(maxsize=queue_size)
+    for task in enumerate(tasks):
+        task_queue.put(task)
+    for _ in range(workers):
+        task_queue.put(None)
+    processes = [
+        multiprocessing.Process(
+            target=_worker, args=(task_queue, results, ordered, batchsize),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for p in processes:
+        p.start()
+    try:
+        running = workers
+        # ordered: batches of tasks after the next one to yield
+        pending = {}
+        finished = set()
+        next_task = 0
+        while running:
+            n,batch = results.get()
+            if n is None:
+                if batch != _DONE:
+                    raise Exception('Walker process failed:\n%s' % batch[1])
+                running -= 1
+                continue
+            if not ordered:
+                if batch != _DONE:
+                    yield from batch
+                continue
+            if batch == _DONE:
+                finished.add(n)
+            elif n == next_task:
+                yield from batch
+            else:
+                pending.setdefault(n, []).append(batch)
+            while next_task in finished:
+                for batch in pending.pop(next_task, []):
+                    yield from batch
+                finished.remove(next_task)
+                next_task += 1
+                for batch in pending.pop(next_task, []):
+                    yield from batch
+        for p in processes:
+            p.join()
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()